@@ -0,0 +1,54 @@
+"""
+Compare `FilenameModel` filesystem engines ('qt', 'pathlib', 'scandir').
+Synthetic directories (half folders, half files) are listed on a local
+disk and with a delay injected into every `os` filesystem call to emulate
+a network share. Qt engine calls are made from C++ and cannot be delayed.
+
+    python benchmarks/bench_fs_engine.py --entries 1000 10000 --latency 0.2
+"""
+
+import tempfile
+from pathlib import Path
+
+from common import (ENGINES, Results, arg_parser, injected_latency,
+                    make_tree, timeit)
+from qtpy import QtWidgets
+
+from breadcrumbsaddressbar.models_views import FilenameModel
+
+
+def measure(engine, path, filter_, repeat):
+    "Best time of `get_file_list` in ms"
+    model = FilenameModel(filter_, fs_engine=engine, icon_provider=None,
+                          cache=None)
+    return timeit(lambda: model.get_file_list(path), repeat)[0]
+
+
+def main():
+    parser = arg_parser(__doc__)
+    parser.add_argument('--entries', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help="ms added to each filesystem call")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])  # noqa: F841
+    results = Results('fs_engine')
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in args.entries:
+            path = make_tree(Path(tmp, str(count)), count)
+            for filter_ in (None, 'dirs'):
+                for engine in ENGINES:
+                    params = {'entries': count, 'filter': filter_ or 'all',
+                              'engine': engine}
+                    local = measure(engine, path, filter_, args.repeat)
+                    remote = None
+                    if engine != 'qt':
+                        with injected_latency(args.latency / 1000):
+                            remote = measure(engine, path, filter_, 1)
+                    results.add('get_file_list', params, ms=local,
+                                latency_ms=remote)
+    results.save(args.json)
+
+
+if __name__ == '__main__':
+    main()
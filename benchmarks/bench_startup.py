@@ -0,0 +1,65 @@
+"""
+Measure `BreadcrumbsAddressBar` construction and first show time per
+instance with eager and lazy (`lazy_init=True`) initialization, with
+own and shared (`shared=True`) caches.
+Exits with status 1 if lazy construction exceeds `--budget`.
+
+    python benchmarks/bench_startup.py --count 50 --budget 2.5
+"""
+
+import sys
+import time
+
+from common import Results, arg_parser, process_events
+from qtpy import QtWidgets
+
+from breadcrumbsaddressbar import BreadcrumbsAddressBar
+
+
+def measure(count, **options):
+    "Mean ms per instance: (construction, construction + first show)"
+    window = QtWidgets.QWidget()  # bars are owned by a window as in apps
+    layout = QtWidgets.QVBoxLayout(window)
+    start = time.perf_counter()
+    for _ in range(count):
+        layout.addWidget(BreadcrumbsAddressBar(window, **options))
+    created = time.perf_counter()
+    window.show()
+    process_events()
+    shown = time.perf_counter()
+    window.close()
+    window.deleteLater()
+    process_events()
+    return ((created - start) * 1000 / count,
+            (shown - start) * 1000 / count)
+
+
+def main():
+    parser = arg_parser(__doc__)
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--budget', type=float, default=None,
+                        help="max ms per lazy instance construction")
+    parser.set_defaults(repeat=3)
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])  # noqa: F841
+    measure(1)  # warm up shared style, icon provider, thread pool
+    results = Results('startup')
+    lazy_create = None
+    for lazy, shared in ((False, False), (True, False), (True, True)):
+        create, show = min(measure(args.count, lazy_init=lazy, shared=shared)
+                           for _ in range(args.repeat))
+        results.add('construct', {'lazy_init': lazy, 'shared': shared,
+                                  'count': args.count},
+                    ms=create, show_ms=show)
+        if lazy and not shared:
+            lazy_create = create
+    results.save(args.json)
+    if args.budget is not None and lazy_create > args.budget:
+        print(f"lazy construction {lazy_create:.2f} ms exceeds "
+              f"budget {args.budget} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
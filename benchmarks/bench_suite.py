@@ -0,0 +1,220 @@
+"""
+Time hot paths of the widget on synthetic directory trees.
+Covers `set_path` on a deep path, `FilenameModel.setPathPrefix` per
+filesystem engine and with in-memory provider, cold start listing
+from `DiskListingCache`, breadcrumb menu popup, completer popup, crumbs layout resize passes and `StyleProxy` painting.
+`--latency` repeats filesystem bound measurements with a delay injected
+into every `os` call and with `LatencyProvider` (delay per request).
+
+    python benchmarks/bench_suite.py --entries 1000 10000 --json results.json
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+from common import (DEPTH, ENGINES, SIZES, Results, arg_parser,
+                    injected_latency, make_deep_path, make_memory_tree,
+                    make_tree, process_events, timeit)
+from qtpy import QtWidgets
+
+from breadcrumbsaddressbar import BreadcrumbsAddressBar
+from breadcrumbsaddressbar.cache import DiskListingCache
+from breadcrumbsaddressbar.layouts import LeftHBoxLayout
+from breadcrumbsaddressbar.models_views import FilenameModel
+from breadcrumbsaddressbar.providers import LatencyProvider, LocalProvider
+
+
+@contextmanager
+def counted_layout_passes(layout: LeftHBoxLayout):
+    "Count `setGeometry` calls of `layout`, yields a list with a counter"
+    counter = [0]
+
+    def set_geometry(rc):  # instance attribute overrides virtual method
+        counter[0] += 1
+        LeftHBoxLayout.setGeometry(layout, rc)
+
+    layout.setGeometry = set_geometry
+    try:
+        yield counter
+    finally:
+        del layout.setGeometry
+
+
+def bench_set_path(results, bar, root, deep, repeat, params=None):
+    "Resolve path and rebuild all / the last breadcrumbs"
+    sibling = deep.with_name(deep.name + " sibling")
+    sibling.mkdir(exist_ok=True)
+    params = {'depth': DEPTH, **(params or {})}
+    best, mean = timeit(lambda: bar.set_path(deep), repeat,
+                        setup=lambda: bar.set_path(root))
+    results.add('set_path', params, ms=best, mean_ms=mean)
+    best, mean = timeit(lambda: bar.set_path(sibling), repeat,
+                        setup=lambda: bar.set_path(deep))
+    results.add('set_path_sibling', params, ms=best, mean_ms=mean)
+
+
+def bench_set_path_prefix(results, path, count, repeat, engines=None,
+                          params=None):
+    "List a directory for menus (no cache) with each `{name: fs_engine}`"
+    if engines is None:
+        engines = {i: i for i in ENGINES}
+    for engine, fs_engine in engines.items():
+        model = FilenameModel('dirs', fs_engine=fs_engine, icon_provider=None,
+                              cache=None)
+
+        def reset(model=model):
+            model.current_path = None
+
+        best, mean = timeit(lambda model=model: model.setPathPrefix(
+            str(path) + os.sep), repeat, setup=reset)
+        results.add('setPathPrefix', {'entries': count, 'engine': engine,
+                                      **(params or {})}, ms=best, mean_ms=mean)
+
+
+def bench_disk_cache(results, path, count, repeat, db_path):
+    "List a directory stored in disk cache with a new model (new session)"
+    disk_cache = DiskListingCache(db_path)
+    models = []  # alive until revalidation tasks finish
+
+    def load():
+        models.append(FilenameModel('dirs', icon_provider=None,
+                                    disk_cache=disk_cache))
+        models[-1].setPathPrefix(str(path) + os.sep)
+
+    load()  # store listing
+    best, mean = timeit(load, repeat)
+    FilenameModel.listing_pool().waitForDone()
+    process_events()  # deliver revalidation results
+    results.add('disk_cache_load', {'entries': count}, ms=best, mean_ms=mean)
+
+
+def bench_crumb_menu(results, bar, path, count, repeat):
+    "Open breadcrumb menu with subdirectories of `path`: cold and cached"
+    bar.set_path(path)
+    menu = bar.crumb_menu()
+    menu.button = list(bar.crumbs_panel.layout().widgets())[-1]
+
+    def show():
+        menu.aboutToShow.emit()
+        menu.adjustSize()
+
+    def reset(clear_cache):
+        bar.fs_model.current_path = None
+        if clear_cache:
+            bar.fs_model.cache.clear()
+
+    for cached in (False, True):
+        best, mean = timeit(show, repeat, setup=lambda: reset(not cached))
+        results.add('crumb_menu_show', {'entries': count, 'cached': cached},
+                    ms=best, mean_ms=mean)
+
+
+def bench_completer(results, bar, path, count, repeat):
+    "Rank completions of a partial name and show completer popup"
+    completer = bar.line_address.completer()
+    model = completer.model()
+    bar.fs_model.setPathPrefix(str(path) + os.sep)  # listing is cached
+
+    def complete():
+        model.request_prefix(str(path / 'fold 1'))
+        completer.complete()
+        process_events()
+
+    def reset():
+        completer.popup().hide()
+        bar.fs_model.current_path = None
+
+    best, mean = timeit(complete, repeat, setup=reset)
+    reset()
+    results.add('completer_popup', {'entries': count}, ms=best, mean_ms=mean)
+
+
+def bench_layout(results, bar, deep, repeat):
+    "Shrink and grow bar showing a deep path, count crumbs layout passes"
+    bar.set_path(deep)
+    widths = list(range(1600, 200, -50)) + list(range(200, 1600, 50))
+
+    def sweep():
+        for width in widths:
+            bar.resize(width, bar.height())
+            process_events()
+
+    with counted_layout_passes(bar.crumbs_panel.layout()) as passes:
+        best, mean = timeit(sweep, repeat)
+    results.add('layout_resize', {'depth': DEPTH, 'resizes': len(widths)},
+                ms=best / len(widths), mean_ms=mean / len(widths),
+                passes=passes[0] / repeat / len(widths))
+
+
+def bench_paint(results, bar, deep, repeat, frames=100):
+    "Repaint breadcrumbs drawn with `StyleProxy`"
+    bar.set_path(deep)
+    bar.resize(1600, bar.height())
+    process_events()
+    crumbs = len(list(bar.crumbs_panel.layout().widgets('visible')))
+
+    def paint():
+        for _ in range(frames):
+            bar.crumbs_panel.repaint()
+
+    best, mean = timeit(paint, repeat)
+    results.add('style_paint', {'crumbs': crumbs},
+                ms=best / frames, mean_ms=mean / frames)
+
+
+def main():
+    parser = arg_parser(__doc__)
+    parser.add_argument('--entries', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--latency', type=float, default=0.2,
+                        help="ms added to each filesystem call, 0 - skip")
+    parser.add_argument('--latency-entries', type=int, default=1000,
+                        help="entries listed with latency injected")
+    args = parser.parse_args()
+
+    app = QtWidgets.QApplication([])  # noqa: F841
+    results = Results('suite')
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp).resolve()
+        deep = make_deep_path(root / "deep")
+        dirs = {i: make_tree(root / str(i), i) for i in args.entries}
+
+        bar = BreadcrumbsAddressBar()
+        bar.resize(800, 30)
+        bar.show()
+        process_events()
+        bench_set_path(results, bar, root, deep, args.repeat)
+        for count, path in dirs.items():
+            bench_set_path_prefix(results, path, count, args.repeat, {
+                **{i: i for i in ENGINES},
+                'memory': make_memory_tree(path, count),
+            })
+            bench_disk_cache(results, path, count, args.repeat,
+                             root / "listings.sqlite")
+            bench_crumb_menu(results, bar, path, count, args.repeat)
+            bench_completer(results, bar, path, count, args.repeat)
+        bench_layout(results, bar, deep, args.repeat)
+        bench_paint(results, bar, deep, args.repeat)
+
+        if args.latency:
+            path = make_tree(root / "latency", args.latency_entries)
+            params = {'latency': args.latency}
+            with injected_latency(args.latency / 1000):
+                bench_set_path(results, bar, root, deep, 1, params)
+                bench_set_path_prefix(results, path, args.latency_entries, 1,
+                                      {i: i for i in ('pathlib', 'scandir')},
+                                      params)
+            remote = LatencyProvider(LocalProvider(), args.latency / 1000)
+            params = {**params, 'provider': 'latency'}
+            bar.close()
+            bar = BreadcrumbsAddressBar(provider=remote)
+            bench_set_path(results, bar, root, deep, args.repeat, params)
+            bench_set_path_prefix(results, path, args.latency_entries,
+                                  args.repeat, {'provider': remote}, params)
+        bar.close()
+    results.save(args.json)
+
+
+if __name__ == '__main__':
+    main()
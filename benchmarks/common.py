@@ -0,0 +1,138 @@
+"""
+Helpers shared by benchmarks: synthetic directory trees, injected
+filesystem latency, timing and machine-readable (JSON) results.
+Benchmarks run headless (`QT_QPA_PLATFORM=offscreen`) by default.
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import qtpy
+from qtpy import QtWidgets
+
+from breadcrumbsaddressbar.providers import MemoryProvider
+
+ENGINES = 'qt', 'pathlib', 'scandir'
+SIZES = 1000, 10000, 100000  # entries in synthetic directories
+DEPTH = 50  # levels of synthetic deep path
+
+
+def make_tree(root: Path, count):
+    "Create `count` entries in `root`: folders and empty files"
+    root.mkdir()
+    for i in range(count):
+        if i % 2:
+            (root / f"folder {i}").mkdir()
+        else:
+            (root / f"file {i}.txt").touch()
+    return root
+
+
+def make_memory_tree(root: Path, count):
+    "`MemoryProvider` with the same entries in `root` as `make_tree` creates"
+    return MemoryProvider({
+        f"folder {i}" if i % 2 else f"file {i}.txt": {} if i % 2 else None
+        for i in range(count)
+    }, root)
+
+
+def make_deep_path(root: Path, depth=DEPTH):
+    "Create `depth` nested folders in `root`, return the deepest one"
+    path = root.joinpath(*(f"level {i}" for i in range(depth)))
+    path.mkdir(parents=True)
+    return path
+
+
+@contextmanager
+def injected_latency(seconds):
+    "Delay `os` filesystem calls used by `pathlib` and `os.scandir`"
+    names = 'stat', 'lstat', 'listdir', 'scandir'
+    originals = {i: getattr(os, i) for i in names}
+
+    def delayed(func):
+        def wrapper(*args, **kwargs):
+            time.sleep(seconds)
+            return func(*args, **kwargs)
+        return wrapper
+
+    for name, func in originals.items():
+        setattr(os, name, delayed(func))
+    try:
+        yield
+    finally:
+        for name, func in originals.items():
+            setattr(os, name, func)
+
+
+def timeit(func, repeat=5, setup=None):
+    "Best and mean time of `func()` in ms, `setup()` is called before each run"
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), sum(times) / len(times)
+
+
+def process_events():
+    QtWidgets.QApplication.processEvents()
+
+
+def arg_parser(doc):
+    "Argument parser with options common to all benchmarks"
+    parser = argparse.ArgumentParser(description=doc.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', metavar='FILE',
+                        help="write results to FILE ('-' for stdout)")
+    return parser
+
+
+class Results:
+    """
+    Benchmark results printed as a table and optionally saved as JSON:
+    {"meta": {...}, "results": [{"name": ..., "params": {...}, ...}]}
+    """
+    def __init__(self, benchmark):
+        self.benchmark = benchmark
+        self.records = []
+
+    def add(self, name, params=None, **values):
+        "Record and print values (e.g. `ms`) measured with `params`"
+        values = {k: round(v, 4) if isinstance(v, float) else v
+                  for k, v in values.items()}
+        self.records.append({'name': name, 'params': params or {}, **values})
+        params = ' '.join(f"{k}={v}" for k, v in (params or {}).items())
+        values = ' '.join(f"{k}={v}" for k, v in values.items())
+        print(f"{name:<24} {params:<36} {values}", file=sys.stderr)
+
+    def meta(self):
+        return {
+            'benchmark': self.benchmark,
+            'time': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'qt_api': qtpy.API_NAME,
+            'qt': qtpy.QT_VERSION,
+        }
+
+    def save(self, file):
+        "Write JSON results to `file` path or stdout ('-'), no-op if None"
+        if file is None:
+            return
+        data = json.dumps({'meta': self.meta(), 'results': self.records},
+                          indent=1)
+        if file == '-':
+            print(data)
+        else:
+            Path(file).write_text(data, encoding='utf-8')
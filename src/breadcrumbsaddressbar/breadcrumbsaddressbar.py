@@ -5,44 +5,226 @@ Andrey Makarov, 2019
 
 import os
 import platform
+from functools import partial
 from pathlib import Path
 from typing import Union
 
 from qtpy import QtCore, QtGui, QtWidgets
 from qtpy.QtCore import Qt
 
+from . import metrics
+from .completion import CompletionModel
+from .icons import TRANSP_ICON_SIZE  # noqa: F401 (moved, re-exported)
+from .icons import IconCache, generic_icon_key
 from .layouts import LeftHBoxLayout
 from .models_views import FilenameModel, MenuListView
-from .stylesheet import style_root_toolbutton
+from .providers import FSProvider, LocalProvider
+from .cache import DiskListingCache, ListingCache, LRUCache
+from .stylesheet import assets_path, style_root_toolbutton
 
 if platform.system() == "Windows":
     from .platform.windows import get_path_label
+elif platform.system() == "Linux":
+    from .platform.linux import MountWatcher
 
-TRANSP_ICON_SIZE = 40, 40  # px, size of generated semi-transparent icons
 cwd_path = Path()  # working dir (.) https://stackoverflow.com/q/51330297
+_validation_pool = None  # see `BreadcrumbsAddressBar.validation_pool`
+
+
+class _ValidationSignals(QtCore.QObject):
+    "Delivers results of `_ValidationTask` to the GUI thread"
+    finished = QtCore.Signal(int, object, object)  # ticket, path, error name
+
+
+class _ValidationTask(QtCore.QRunnable):
+    "Run `validate_path` in `QThreadPool`"
+    def __init__(self, func, path, ticket, signals):
+        super().__init__()
+        self.func = func
+        self.path = path
+        self.ticket = ticket
+        self.signals = signals
+
+    def run(self):
+        try:
+            result = self.func(self.path)
+        except PermissionError:  # bar must not stay pending
+            result = self.path, 'listdir_error'
+        except Exception:
+            result = self.path, 'path_error'
+        self.signals.finished.emit(self.ticket, *result)
+
+
+class _DevicesSignals(QtCore.QObject):
+    "Delivers results of `_DevicesTask` to the GUI thread"
+    finished = QtCore.Signal(object)  # [(path, caption, icon key), ...]
+
+
+class _DevicesTask(QtCore.QRunnable):
+    "Run `list_devices` in `QThreadPool`"
+    def __init__(self, func, dpr, signals):
+        super().__init__()
+        self.func = func
+        self.dpr = dpr
+        self.signals = signals
+
+    def run(self):
+        devices = None  # failed, see `SharedService._devices_listed`
+        try:
+            with metrics.timed('list_devices'):
+                devices = self.func(self.dpr)
+        finally:  # error is reported, listing is not blocked
+            self.signals.finished.emit(devices)
+
+
+class SharedService(QtCore.QObject):
+    """
+    Data of address bars which browse the same filesystems: listing
+    caches, icon cache, places and devices. Directories are listed,
+    icons are loaded and devices are enumerated once for all bars.
+    Pass `shared=True` (process-wide `instance()`) or an instance to
+    `BreadcrumbsAddressBar`.
+    `max_icons` - max count of icons in `icon_cache`
+    """
+    devices_changed = QtCore.Signal(object)  # [(path, caption, icon key)]
+    _instance = None
+
+    def __init__(self, parent=None, max_icons=256):
+        super().__init__(parent)
+        self.icon_cache = IconCache(max_entries=max_icons)
+        self._listing_caches = {}  # (provider, filter): ListingCache
+        self._places = None  # see `places`
+        self.devices = None  # see `list_devices`, None - not listed yet
+        self._devices_listing = False  # `list_devices` is running
+        self._devices_outdated = False  # devices changed while listing
+        self._devices_signals = _DevicesSignals(self)
+        self._devices_signals.finished.connect(self._devices_listed)
+        self._mounts_watched = False
+
+    @classmethod
+    def instance(cls):
+        "Service shared by all address bars of the application"
+        if cls._instance is None:
+            cls._instance = cls(QtWidgets.QApplication.instance())
+        return cls._instance
+
+    def listing_cache(self, provider=None, filter_=None):
+        """
+        Cache of listings of `provider` (None - local filesystem) filtered
+        with `filter_` (see `FilenameModel`)
+        """
+        key = provider, filter_
+        cache = self._listing_caches.get(key)
+        if cache is None:
+            cache = self._listing_caches[key] = ListingCache(
+                watch=provider is None or isinstance(provider, LocalProvider))
+        return cache
+
+    def places(self):
+        "List of (name, path) common places, see `list_places`"
+        if self._places is None:
+            self._places = BreadcrumbsAddressBar.list_places()
+        return self._places
+
+    def update_devices(self, force=True):
+        """
+        SLOT: list devices in background, `devices_changed` is emitted when
+        done. If not `force` devices are listed only if they are not known
+        or not watched (mount changes are tracked on Linux).
+        """
+        if platform.system() == "Linux" and not self._mounts_watched:
+            MountWatcher.instance().changed.connect(self.update_devices)
+            self._mounts_watched = True
+        elif not force and self.devices is not None and self._mounts_watched:
+            return
+        if self._devices_listing:
+            self._devices_outdated |= force  # list again when finished
+            return
+        self._devices_listing = True
+        dpr = QtGui.QGuiApplication.instance().devicePixelRatio()
+        # Shared with path checks: mounts may hang, keep other pools free
+        BreadcrumbsAddressBar.validation_pool().start(_DevicesTask(
+            BreadcrumbsAddressBar.list_devices, dpr, self._devices_signals))
+
+    def _devices_listed(self, devices):
+        "SLOT: `list_devices` is done"
+        if devices is None:  # failed, keep previous devices
+            devices = self.devices or []
+        self.devices = devices
+        self._devices_listing = False
+        self.devices_changed.emit(devices)
+        if self._devices_outdated:
+            self._devices_outdated = False
+            self.update_devices()
 
 
 class BreadcrumbsAddressBar(QtWidgets.QFrame):
-    "Windows Explorer-like address bar"
+    """
+    Windows Explorer-like address bar
+    Constructor options:
+    `async_listing` (bool) - list directories for menus and completer in
+                             background (see `FilenameModel`)
+    `lazy_icons` (bool) - resolve icons of menu/completer items in background
+    `streaming` (bool) - show first entries of huge directories at once and
+                         read the rest in chunks on scrolling
+    `completion_delay` (int) - ms of typing inactivity before completions
+                               are listed, 0 - update on every keystroke
+    `fuzzy_completion` (bool) - complete also names containing typed text
+                                or its letters in order (scans all names
+                                on every edit), False - prefix matches only
+    `validation_timeout` (int, None) - resolve and check paths passed to
+                               `set_path` in background, fail after timeout
+                               in ms; 0 - no timeout; None - check
+                               synchronously
+    `lazy_init` (bool) - build root menu on first popup, breadcrumbs on
+                         first show and completer on first edit
+    `provider` (FSProvider, None) - filesystem to browse, None - local
+                                    filesystem listed with `QDir`
+    `prefetch_depth` (int) - list current folder and up to N parent folders
+                             in background when path is set, so breadcrumb
+                             menus open at once; 0 - list on demand
+    `shared` (bool, SharedService) - share listing and icon caches, places
+                                     and devices with other bars: True -
+                                     `SharedService.instance()`, False -
+                                     own data
+    `disk_cache` (bool, DiskListingCache) - keep listings on disk between
+                        sessions (see `FilenameModel`): True - SQLite
+                        database in user cache dir, False - no disk cache
+    """
     listdir_error = QtCore.Signal(Path)  # failed to list a directory
     path_error = QtCore.Signal(Path)  # entered path does not exist
     path_selected = QtCore.Signal(Path)
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, async_listing=False, lazy_icons=False,
+                 streaming=False, completion_delay=0, fuzzy_completion=True,
+                 validation_timeout=None, lazy_init=False, provider=None,
+                 prefetch_depth=0, shared=False, disk_cache=False):
         super().__init__(parent)
         self.os_type = platform.system()
 
-        self.style_crumbs = StyleProxy(
-            QtWidgets.QStyleFactory.create(
-                QtWidgets.QApplication.instance().style().objectName()
-            ),
-            QtGui.QPixmap("iconfinder_icon-ios7-arrow-right_211607.png")
-        )
+        self.style_crumbs = StyleProxy.shared()
 
         layout = QtWidgets.QHBoxLayout(self)
 
-        self.file_ico_prov = QtWidgets.QFileIconProvider()
-        self.fs_model = FilenameModel('dirs', icon_provider=self.get_icon)
+        if shared is True:
+            self.shared = SharedService.instance()
+        else:
+            self.shared = shared or SharedService(self)
+        self.icon_cache = self.shared.icon_cache
+        self.file_ico_prov = self.icon_cache.provider
+        self.provider = LocalProvider() if provider is None else provider
+        self.fs_model = FilenameModel('dirs', fs_engine=provider or 'qt',
+                                      icon_provider=self.get_icon,
+                                      cache=self.shared.listing_cache(
+                                          provider, 'dirs'),
+                                      disk_cache=(
+                                          DiskListingCache.instance()
+                                          if disk_cache is True
+                                          else disk_cache or None),
+                                      async_listing=async_listing,
+                                      lazy_icons=lazy_icons,
+                                      streaming=streaming)
+        self.fs_model.listdir_error.connect(self.listdir_error)
 
         pal = self.palette()
         pal.setColor(QtGui.QPalette.ColorRole.Window,
@@ -64,9 +246,11 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         self.line_address.focusOutEvent = self.line_address_focusOutEvent
         self.line_address.contextMenuEvent = self.line_address_contextMenuEvent
         layout.addWidget(self.line_address)
-        # Add QCompleter to address line
-        completer = self.init_completer(self.line_address, self.fs_model)
-        completer.activated.connect(self.set_path)
+        self.completion_delay = completion_delay
+        self.fuzzy_completion = fuzzy_completion
+        self.act_loading = None  # see `_setup_completer`
+        if not lazy_init:
+            self._setup_completer()
 
         # Container for `btn_crumbs_hidden`, `crumbs_panel`, `switch_space`
         self.crumbs_container = QtWidgets.QWidget(self)
@@ -75,10 +259,6 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         crumbs_cont_layout.setSpacing(0)
         layout.addWidget(self.crumbs_container)
 
-        # Monitor breadcrumbs under cursor and switch popup menus
-        self.mouse_pos_timer = QtCore.QTimer(self)
-        self.mouse_pos_timer.timeout.connect(self.mouse_pos_timer_event)
-
         # Hidden breadcrumbs menu button
         self.btn_root_crumb = QtWidgets.QToolButton(self)
         self.btn_root_crumb.setAutoRaise(True)
@@ -89,15 +269,19 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         crumbs_cont_layout.addWidget(self.btn_root_crumb)
         menu = QtWidgets.QMenu(self.btn_root_crumb)  # FIXME:
         menu.aboutToShow.connect(self._hidden_crumbs_menu_show)
-        menu.aboutToHide.connect(self.mouse_pos_timer.stop)
+        # Monitor breadcrumbs under cursor and switch popup menus
+        menu.installEventFilter(self)
         self.btn_root_crumb.setMenu(menu)
-        self.init_rootmenu_places(menu)  # Desktop, Home, Downloads...
-        self.update_rootmenu_devices()  # C:, D:...
+        self.actions_hidden_crumbs = {}  # path: QAction
+        self.actions_devices = {}  # path: QAction
+        self._rootmenu_ready = False  # places and devices are added
+        if not lazy_init:
+            self._init_rootmenu(menu)
 
         # Container for breadcrumbs
         self.crumbs_panel = QtWidgets.QWidget(self)
         crumbs_layout = LeftHBoxLayout(self.crumbs_panel)
-        crumbs_layout.widget_state_changed.connect(self.crumb_hide_show)
+        crumbs_layout.widgets_state_changed.connect(self.crumb_hide_show)
         crumbs_layout.setContentsMargins(0, 0, 0, 0)
         crumbs_layout.setSpacing(0)
         crumbs_cont_layout.addWidget(self.crumbs_panel)
@@ -120,37 +304,73 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
 
         self.setMaximumHeight(self.line_address.height())  # FIXME:
 
+        self._crumb_menu = None  # see `crumb_menu`
+        self.validation_timeout = validation_timeout
+        self.prefetch_depth = prefetch_depth
+        self._validation_ticket = 0  # id of the latest `set_path` request
+        self._validation_signals = _ValidationSignals(self)
+        self._validation_signals.finished.connect(self._validation_finished)
+        self._validation_timer = QtCore.QTimer(self)
+        self._validation_timer.setSingleShot(True)
+        self._validation_timer.timeout.connect(self._validation_timed_out)
+        self._pending_path = None
         self.ignore_resize = False
         self.path_ = None
-        self.set_path(Path())
+        self._view_deferred = lazy_init  # crumbs are built in `showEvent`
+        self.set_path(Path(), block=True)
 
     @staticmethod
-    def init_completer(edit_widget, model):
+    def init_completer(edit_widget, model, delay=0, fuzzy=True):
         "Init QCompleter to work with filesystem"
         completer = QtWidgets.QCompleter(edit_widget)
-        completer.setCaseSensitivity(Qt.CaseInsensitive)
-        completer.setModel(model)
+        # Entries are filtered and ranked by `CompletionModel`
+        completion_model = CompletionModel(model, completer, fuzzy=fuzzy,
+                                           delay=delay)
+        completer.setModel(completion_model)
+        completer.setCompletionMode(
+            QtWidgets.QCompleter.CompletionMode.UnfilteredPopupCompletion)
         # Optimize performance https://stackoverflow.com/a/33454284/1119602
         popup = completer.popup()
         popup.setUniformItemSizes(True)
         popup.setLayoutMode(QtWidgets.QListView.Batched)
         edit_widget.setCompleter(completer)
-        edit_widget.textEdited.connect(model.setPathPrefix)
+        edit_widget.textEdited.connect(completion_model.request_prefix)
         return completer
 
-    def get_icon(self, path: Union[str, Path]):
-        "Path -> QIcon"
-        fileinfo = QtCore.QFileInfo(str(path))
-        dat = self.file_ico_prov.icon(fileinfo)
-        if fileinfo.isHidden():
-            pmap = QtGui.QPixmap(*TRANSP_ICON_SIZE)
-            pmap.fill(Qt.transparent)
-            painter = QtGui.QPainter(pmap)
-            painter.setOpacity(0.5)
-            dat.paint(painter, 0, 0, *TRANSP_ICON_SIZE)
-            painter.end()
-            dat = QtGui.QIcon(pmap)
-        return dat
+    def _setup_completer(self):
+        "Add QCompleter and busy indicator to address line"
+        completer = self.init_completer(self.line_address, self.fs_model,
+                                        self.completion_delay,
+                                        self.fuzzy_completion)
+        completer.activated.connect(self.set_path)
+        completer.model().prefix_applied.connect(self._update_completer_popup)
+        # Busy indicator shown while completions are listed in background
+        self.act_loading = self.line_address.addAction(
+            self.style().standardIcon(QtWidgets.QStyle.StandardPixmap.SP_BrowserReload),
+            QtWidgets.QLineEdit.ActionPosition.TrailingPosition)
+        self.act_loading.setVisible(False)
+        self.fs_model.loading_changed.connect(self._completer_loading)
+
+    def _completer_loading(self, loading):
+        "SLOT: show busy indicator, update completer popup when listing is done"
+        self.act_loading.setVisible(loading)
+        if not loading:
+            self._update_completer_popup()
+
+    def _update_completer_popup(self):
+        "SLOT: show completions if address line is being edited"
+        if self.line_address.hasFocus():
+            self.line_address.completer().complete()
+
+    def get_icon(self, path: Union[str, Path], key=None):
+        "Path -> QIcon, see `IconCache.icon`"
+        return self.icon_cache.icon(path, key)
+
+    def _folder_icon_key(self):
+        "Icon key of a folder of `provider`, None - get it from local file"
+        if isinstance(self.provider, LocalProvider):
+            return None
+        return generic_icon_key('folder')
 
     def line_address_contextMenuEvent(self, event):
         self.line_address_context_menu_flag = True
@@ -164,38 +384,52 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
 
     def _hidden_crumbs_menu_show(self):
         "SLOT: fill menu with hidden breadcrumbs list"
-        self.mouse_pos_timer.start(100)
         menu = self.sender()
-        if hasattr(self, 'actions_hidden_crumbs'):
-            for action in self.actions_hidden_crumbs:
-                menu.removeAction(action)
-        self.actions_hidden_crumbs = []
-
-        first_action = menu.actions()[0]  # places section separator
-        for i in self.crumbs_panel.layout().widgets('hidden'):
-            action = QtWidgets.QAction(self.get_icon(i.path), i.text(), menu)
-            action.path = i.path
-            action.triggered.connect(self.set_path)
-            menu.insertAction(first_action, action)
-            self.actions_hidden_crumbs.append(action)
-            first_action = action
+        if not self._rootmenu_ready:
+            self._init_rootmenu(menu)
+        with metrics.timed('root_menu'):
+            # The last hidden crumb is on top
+            key = self._folder_icon_key()
+            crumbs = [(i.path, i.text(), key) for i in
+                      self.crumbs_panel.layout().widgets('hidden')][::-1]
+            self.actions_hidden_crumbs = self._update_menu_actions(
+                menu, self.actions_hidden_crumbs, crumbs,
+                self.places_separator)
+
+    def _init_rootmenu(self, menu):
+        "Add places and devices sections, start watching mounts"
+        self.init_rootmenu_places(menu)  # Desktop, Home, Downloads...
+        self.devices_separator = menu.addSeparator()
+        self._rootmenu_ready = True
+        self.shared.devices_changed.connect(self._devices_listed)
+        if self.shared.devices is not None:  # listed for another bar
+            self._devices_listed(self.shared.devices)
+        self.shared.update_devices(force=False)  # C:, D:...
 
     def init_rootmenu_places(self, menu):
         "Init common places actions in menu"
-        menu.addSeparator()
+        self.places_separator = menu.addSeparator()
+        for name, path in self.shared.places():
+            action = menu.addAction(self.get_icon(path), name)
+            action.path = path
+            action.triggered.connect(self.set_path)
+
+    @staticmethod
+    def list_places():
+        "List (name, path) of Desktop, Home, Documents, Downloads folders"
         QSP = QtCore.QStandardPaths
         uname = os.environ.get('USER') or os.environ.get('USERNAME') or "Home"
+        places = []
         for name, path in (
                 ("Desktop", QSP.writableLocation(QSP.DesktopLocation)),
                 (uname, QSP.writableLocation(QSP.HomeLocation)),
                 ("Documents", QSP.writableLocation(QSP.DocumentsLocation)),
                 ("Downloads", QSP.writableLocation(QSP.DownloadLocation)),
                 ):
-            if self.os_type == "Windows":
-                name = self.get_path_label(path)
-            action = menu.addAction(self.get_icon(path), name)
-            action.path = path
-            action.triggered.connect(self.set_path)
+            if platform.system() == "Windows":
+                name = get_path_label(path.replace("/", "\\"))
+            places.append((name, path))
+        return places
 
     def get_path_label(self, drive_path):
         "Try to get path label using Shell32 on Windows"
@@ -217,31 +451,87 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
             if path:  # `symLinkTarget` doesn't read e.g. FTP links
                 yield i.name, path
 
-    def update_rootmenu_devices(self):
-        "Init or rebuild device actions in menu"
-        menu = self.btn_root_crumb.menu()
-        if hasattr(self, 'actions_devices'):
-            for action in self.actions_devices:
-                menu.removeAction(action)
-        self.actions_devices = [menu.addSeparator()]
+    @classmethod
+    def list_devices(cls, dpr=None):
+        """
+        List (path, caption, icon key) of mounted volumes and network
+        locations. Thread-safe if `dpr` is set, may block on hung mounts.
+        Icons are generic (`generic_icon_key`): resolving an icon of a hung
+        volume would freeze GUI thread.
+        """
+        os_type = platform.system()
+        devices, paths = [], set()
         for i in QtCore.QStorageInfo.mountedVolumes():  # QDir.drives():
             path, label = i.rootPath(), i.displayName()
-            if label == path and self.os_type == "Windows":
-                label = self.get_path_label(path)
-            elif self.os_type == "Linux" and not path.startswith("/media"):
+            if path in paths:
+                continue
+            if label == path and os_type == "Windows":
+                label = get_path_label(path.replace("/", "\\"))
+            elif os_type == "Linux" and not path.startswith("/media"):
                 # Add to list only volumes in /media
                 continue
             caption = "%s (%s)" % (label, path.rstrip(r"\/"))
-            action = menu.addAction(self.get_icon(path), caption)
-            action.path = path
-            action.triggered.connect(self.set_path)
-            self.actions_devices.append(action)
-        if self.os_type == "Windows":  # Network locations
-            for label, path in self.list_network_locations():
-                action = menu.addAction(self.get_icon(path), label)
+            devices.append((path, caption, generic_icon_key('drive', dpr=dpr)))
+            paths.add(path)
+        if os_type == "Windows":  # Network locations
+            devices.extend((path, label, generic_icon_key('folder', dpr=dpr))
+                           for label, path in cls.list_network_locations()
+                           if path not in paths)
+        return devices
+
+    def update_rootmenu_devices(self):
+        "SLOT: list devices in background, then update device actions in menu"
+        if not self._rootmenu_ready:
+            return  # devices are listed when menu is shown first time
+        self.shared.update_devices()  # see `_devices_listed`
+
+    def _devices_listed(self, devices):
+        "SLOT: add new, update existing and remove stale device actions"
+        # Devices are placed at the end of menu
+        self.actions_devices = self._update_menu_actions(
+            self.btn_root_crumb.menu(), self.actions_devices, devices)
+
+    def _update_menu_actions(self, menu, actions, items, end=None):
+        """
+        Show actions of (path, text, icon key) `items` in order before `end`
+        action (None - at the end of `menu`). Previous {path: QAction}
+        `actions` are reused, stale ones are deleted. Returns new mapping.
+        """
+        if [i[0] for i in items] == list(actions) and \
+                all(actions[path].text() == text for path, text, _ in items):
+            return actions  # nothing changed
+        stale = dict(actions)
+        actions = {}
+        before = end
+        for path, text, key in reversed(items):
+            action = stale.pop(path, None)
+            if action is None:  # icon is requested for new items only
+                action = QtWidgets.QAction(self.get_icon(path, key), text,
+                                           menu)
                 action.path = path
                 action.triggered.connect(self.set_path)
-                self.actions_devices.append(action)
+                self._insert_menu_action(menu, before, action)
+            else:
+                action.setText(text)
+                menu_actions = menu.actions()
+                idx = menu_actions.index(action) + 1
+                if (menu_actions[idx] if idx < len(menu_actions) else None) \
+                        is not before:
+                    self._insert_menu_action(menu, before, action)  # move
+            actions[path] = action
+            before = action
+        for action in stale.values():
+            menu.removeAction(action)
+            action.deleteLater()
+        return dict(reversed(actions.items()))
+
+    @staticmethod
+    def _insert_menu_action(menu, before, action):
+        "Insert (or move) `action` before `before` action or to the end"
+        if before is None:
+            menu.addAction(action)
+        else:
+            menu.insertAction(before, action)
 
     def _browse_for_folder(self):
         path = QtWidgets.QFileDialog.getExistingDirectory(
@@ -264,15 +554,19 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         else:
             QtWidgets.QLineEdit.keyPressEvent(self.line_address, event)
 
-    def _clear_crumbs(self):
+    def _clear_crumbs(self, start=0):
+        "Remove breadcrumbs starting from `start` index"
         layout = self.crumbs_panel.layout()
-        while layout.count():
-            widget = layout.takeAt(0).widget()
+        if layout.count() <= start:
+            return
+        while layout.count() > start:
+            widget = layout.takeAt(layout.count() - 1).widget()
             if widget:
                 # Unset style or `StyleProxy.drawPrimitive` is called once with
                 # mysterious `QWidget` instead of `QToolButton` (Windows 7)
                 widget.setStyle(None)
                 widget.deleteLater()
+        self.crumb_hide_show()  # hidden crumbs may be removed
     
     @staticmethod
     def path_title(path: Path):
@@ -280,24 +574,49 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         # FIXME: C:\ has no name. Use rstrip on Windows only?
         return path.name or str(path).upper().rstrip(os.path.sep)
 
+    def _update_crumbs(self, path):
+        "Keep breadcrumbs of common parent folders, replace the rest"
+        if self._view_deferred:
+            return
+        paths = [path]
+        for i in path.parents:
+            if i == cwd_path:
+                break
+            paths.append(i)
+        paths.reverse()
+        keep = 0
+        for btn, i in zip(self.crumbs_panel.layout().widgets(), paths):
+            if str(btn.path) != str(i):
+                break
+            keep += 1
+        layout = self.crumbs_panel.layout()
+        with metrics.timed('crumbs', path=path,
+                           inserted=len(paths) - keep):
+            self.crumbs_panel.setUpdatesEnabled(False)
+            layout.setEnabled(False)  # lay out crumbs once, see below
+            self._clear_crumbs(keep)
+            for i in paths[keep:]:
+                self._insert_crumb(i)
+            layout.setEnabled(True)
+            self.crumbs_panel.setUpdatesEnabled(True)
+
     def _insert_crumb(self, path):
+        "Append breadcrumb of `path` to the right"
         btn = QtWidgets.QToolButton(self.crumbs_panel)
         btn.setAutoRaise(True)
         btn.setPopupMode(btn.ToolButtonPopupMode.MenuButtonPopup)
         btn.setStyle(self.style_crumbs)
         btn.mouseMoveEvent = self.crumb_mouse_move
+        btn.mousePressEvent = partial(self.crumb_mouse_press, btn)
+        btn.showMenu = partial(self._show_crumb_menu, btn)
         btn.setMouseTracking(True)
         btn.setText(self.path_title(path))
         btn.path = path
         btn.clicked.connect(self.crumb_clicked)
-        menu = MenuListView(btn)
-        menu.aboutToShow.connect(self.crumb_menu_show)
-        menu.setModel(self.fs_model)
-        menu.clicked.connect(self.crumb_menuitem_clicked)
-        menu.activated.connect(self.crumb_menuitem_clicked)
-        menu.aboutToHide.connect(self.mouse_pos_timer.stop)
-        btn.setMenu(menu)
-        self.crumbs_panel.layout().insertWidget(0, btn)
+        btn.setMenu(self.crumb_menu())
+        self.crumbs_panel.layout().addWidget(btn)
+        if self.crumbs_panel.isVisible():  # show now, not on queued event
+            btn.show()                     # which triggers layout pass
         btn.setMinimumSize(btn.minimumSizeHint())  # fixed size breadcrumbs
         sp = btn.sizePolicy()
         sp.setVerticalPolicy(sp.Policy.Minimum)
@@ -305,6 +624,33 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         # print(self._check_space_width(btn.minimumWidth()))
         # print(btn.size(), btn.sizeHint(), btn.minimumSizeHint())
 
+    def crumb_menu(self):
+        """
+        Popup menu shared by all breadcrumbs, created along with the first
+        breadcrumb. `button` of the menu is set to the breadcrumb it is
+        shown for (see `crumb_menu_show`)
+        """
+        if self._crumb_menu is None:
+            menu = self._crumb_menu = MenuListView(self)
+            menu.aboutToShow.connect(self.crumb_menu_show)
+            menu.setModel(self.fs_model)
+            menu.clicked.connect(self.crumb_menuitem_clicked)
+            menu.activated.connect(self.crumb_menuitem_clicked)
+            menu.installEventFilter(self)  # see `eventFilter`
+        return self._crumb_menu
+
+    def _show_crumb_menu(self, btn):
+        "Show popup menu of a breadcrumb or root button"
+        if btn.menu() is self._crumb_menu:
+            self._crumb_menu.button = btn
+        QtWidgets.QToolButton.showMenu(btn)
+
+    def crumb_mouse_press(self, btn, event):
+        "EVENT: point shared menu to the breadcrumb before it is shown"
+        if btn.menu() is self._crumb_menu:
+            self._crumb_menu.button = btn
+        QtWidgets.QToolButton.mousePressEvent(btn, event)
+
     def crumb_mouse_move(self, event):
         ...
         # print('move!')
@@ -320,36 +666,135 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
     def crumb_menu_show(self):
         "SLOT: fill subdirectory list on menu open"
         menu = self.sender()
-        self.fs_model.setPathPrefix(str(menu.parent().path) + os.path.sep)
-        menu.clear_selection()  # clear currentIndex after applying new model
-        self.mouse_pos_timer.start(100)
-
-    def set_path(self, path=None):
+        crumbs = list(self.crumbs_panel.layout().widgets())
+        if menu.button not in crumbs:  # not set by mouse press or `showMenu`
+            focused = QtWidgets.QApplication.focusWidget()  # keyboard
+            menu.button = focused if focused in crumbs else crumbs[-1]
+        with metrics.timed('crumb_menu', path=menu.button.path):
+            self.fs_model.setPathPrefix(str(menu.button.path) + os.path.sep)
+            menu.clear_selection()  # clear currentIndex after applying new model
+
+    def set_path(self, path=None, block=None):
         """
         Set path displayed in this BreadcrumbsAddressBar
         Returns `False` if path does not exist or permission error.
         Can be used as a SLOT: `sender().path` is used if `path` is `None`)
+        If `block` is False (default if `validation_timeout` is set) path is
+        shown as pending and checked in background, returns `None`.
         """
-        path, emit_err = Path(path or self.sender().path), None
-        try:  # C: -> C:\, folder\..\folder -> folder
-            path = path.resolve()
-        except PermissionError:
-            emit_err = self.listdir_error
-        if not path.exists():
-            emit_err = self.path_error
+        path = Path(path or self.sender().path)
+        if block is None:
+            block = self.validation_timeout is None
+        if not block:
+            self._validate_async(path)
+            return None
+        self._validation_ticket += 1  # cancel pending request
+        pending = self.is_pending()
+        path, emit_err = self.validate_path(path, self.provider)
+        if pending:  # crumbs of `path_` are restored on error only
+            self._end_validation(restore=bool(emit_err))
         self._cancel_edit()  # exit edit mode
         if emit_err:  # permission error or path does not exist
-            emit_err.emit(path)
+            getattr(self, emit_err).emit(path)
             return False
-        self._clear_crumbs()
+        self._apply_path(path)
+        return True
+
+    @staticmethod
+    def validate_path(path: Path, provider: FSProvider = None):
+        """
+        Resolve `path` and check it exists (thread-safe).
+        Returns resolved path and name of error signal or None.
+        """
+        if provider is None:
+            provider = LocalProvider()
+        with metrics.timed('validate_path', path=path):
+            emit_err = None
+            try:  # C: -> C:\, folder\..\folder -> folder
+                path = provider.resolve(path)
+            except PermissionError:
+                emit_err = 'listdir_error'
+            except (OSError, RuntimeError):  # e.g. symlink loop
+                return path, 'path_error'
+            try:
+                if not provider.exists(path):
+                    emit_err = 'path_error'
+            except (OSError, RuntimeError):
+                emit_err = 'path_error'
+        return path, emit_err
+
+    @staticmethod
+    def validation_pool():
+        """
+        Thread pool for path checks: requests to hung mounts may never
+        return, they should not block other background tasks.
+        Devices are listed in this pool too. At most 4 tasks run at once:
+        while they hang, later checks wait in queue and time out, devices
+        are not updated.
+        """
+        global _validation_pool
+        if _validation_pool is None:
+            _validation_pool = QtCore.QThreadPool()
+            _validation_pool.setMaxThreadCount(4)
+        return _validation_pool
+
+    def _validate_async(self, path):
+        "Show `path` as pending, check it in background"
+        self._validation_ticket += 1
+        self._pending_path = path
+        self._cancel_edit()
+        self.crumbs_panel.setEnabled(False)  # pending state
+        self._update_crumbs(self.provider.normpath(path))  # w/o filesystem
+        self.validation_pool().start(_ValidationTask(
+            partial(self.validate_path, provider=self.provider), path,
+            self._validation_ticket, self._validation_signals
+        ))
+        if self.validation_timeout:  # 0 - no timeout
+            self._validation_timer.start(self.validation_timeout)
+
+    def _validation_finished(self, ticket, path, emit_err):
+        "SLOT: background path check is done"
+        if ticket != self._validation_ticket:
+            return  # outdated or timed out
+        self._end_validation(restore=bool(emit_err))
+        if emit_err:
+            getattr(self, emit_err).emit(path)
+        else:
+            self._apply_path(path)  # reconciles pending crumbs
+
+    def _validation_timed_out(self):
+        "SLOT: path check took too long"
+        self._validation_ticket += 1
+        path = self._end_validation()
+        self.path_error.emit(path)
+
+    def _end_validation(self, restore=True):
+        """
+        Leave pending state, show crumbs of current path if `restore`.
+        Returns pending path
+        """
+        self._validation_timer.stop()
+        self.crumbs_panel.setEnabled(True)
+        if restore and self.path_ is not None:
+            self._update_crumbs(self.path_)
+        path, self._pending_path = self._pending_path, None
+        return path
+
+    def is_pending(self):
+        "Check if a path passed to `set_path` is being checked"
+        return self._pending_path is not None
+
+    def _apply_path(self, path):
+        "Show valid resolved `path`"
         self.path_ = path
         self.line_address.setText(str(path))
-        self._insert_crumb(path)
-        for i in path.parents:
-            if i == cwd_path:
-                break
-            self._insert_crumb(i)
-        self.path_icon.setPixmap(self.get_icon(self.path_).pixmap(16, 16))
+        self._update_crumbs(path)
+        if not self._view_deferred:
+            self.path_icon.setPixmap(self.get_icon(
+                path, self._folder_icon_key()).pixmap(16, 16))
+        if self.prefetch_depth > 0:  # current folder first
+            self.fs_model.prefetch(
+                [path, *path.parents][:self.prefetch_depth + 1])
         self.path_selected.emit(self.path_)
         return True
 
@@ -358,6 +803,18 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         self.line_address.setText(str(self.path()))  # revert path
         self._show_address_field(False)  # switch back to breadcrumbs view
 
+    def showEvent(self, event):
+        "EVENT: build breadcrumbs deferred by `lazy_init`"
+        if self._view_deferred:
+            self._view_deferred = False
+            path = self.path_
+            if self._pending_path is not None:
+                path = self.provider.normpath(self._pending_path)
+            self._update_crumbs(path)
+            self.path_icon.setPixmap(self.get_icon(
+                self.path_, self._folder_icon_key()).pixmap(16, 16))
+        super().showEvent(event)
+
     def path(self):
         "Get path displayed in this BreadcrumbsAddressBar"
         return self.path_
@@ -371,6 +828,8 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
     def _show_address_field(self, b_show):
         "Show text address field"
         if b_show:
+            if self.act_loading is None:  # `lazy_init`
+                self._setup_completer()
             self.crumbs_container.hide()
             self.line_address.show()
             self.line_address.setFocus()
@@ -379,8 +838,8 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
             self.line_address.hide()
             self.crumbs_container.show()
 
-    def crumb_hide_show(self, widget, state:bool):
-        "SLOT: a breadcrumb is hidden/removed or shown"
+    def crumb_hide_show(self, *args):
+        "SLOT: breadcrumbs are hidden/removed or shown"
         layout = self.crumbs_panel.layout()
         arrow = Qt.LeftArrow if layout.count_hidden() > 0 else Qt.RightArrow
         self.btn_root_crumb.setArrowType(arrow)
@@ -394,26 +853,80 @@ class BreadcrumbsAddressBar(QtWidgets.QFrame):
         # print(self.layout().minimumSize().width())
         return QtCore.QSize(150, self.line_address.height())
 
-    def mouse_pos_timer_event(self):
-        "Monitor breadcrumbs under cursor and switch popup menus"
-        pos = QtGui.QCursor.pos()
-        app = QtCore.QCoreApplication.instance()
-        w = app.widgetAt(pos)
-        active_menu = app.activePopupWidget()
-        if (w and isinstance(w, QtWidgets.QToolButton) and
-            w is not active_menu.parent() and
-            (w is self.btn_root_crumb or w.parent() is self.crumbs_panel)
-        ):
-            active_menu.close()
-            w.showMenu()
+    def eventFilter(self, obj, event):
+        """
+        Switch popup menus of breadcrumbs and root button on mouse move.
+        Open popup menu grabs mouse, so it receives moves over the buttons.
+        """
+        if (event.type() == QtCore.QEvent.Type.MouseMove and
+                obj.isVisible() and isinstance(obj, QtWidgets.QMenu)):
+            if hasattr(event, 'globalPosition'):
+                pos = event.globalPosition().toPoint()
+            else:  # Qt5
+                pos = event.globalPos()
+            btn = self._menu_button_at(pos)
+            if btn and btn is not (getattr(obj, 'button', None) or obj.parent()):
+                obj.close()
+                QtCore.QTimer.singleShot(0, partial(self._show_crumb_menu, btn))
+                return True
+        return super().eventFilter(obj, event)
+
+    def _menu_button_at(self, pos):
+        "Root button or visible breadcrumb at global `pos`"
+        for btn in (self.btn_root_crumb,
+                    *self.crumbs_panel.layout().widgets('visible')):
+            if btn.isVisible() and btn.rect().contains(btn.mapFromGlobal(pos)):
+                return btn
+        return None
 
 class StyleProxy(QtWidgets.QProxyStyle):
     win_modern = ("windowsxp", "windowsvista")
+    arrow_file = "iconfinder_icon-ios7-arrow-right_211607.png"
+    _shared = {}  # base style name: StyleProxy
 
     def __init__(self, style, arrow_pix):
         super().__init__(style)
         self.arrow_pix = arrow_pix
         self.stylename = self.baseStyle().objectName()
+        self._arrow_rects = LRUCache(64)  # button size: arrow QRect
+        self._arrow_pixmaps = LRUCache(16)  # (size, dpr): scaled arrow_pix
+
+    @classmethod
+    def shared(cls):
+        "Instance for current application style shared by all address bars"
+        app = QtWidgets.QApplication.instance()
+        name = app.style().objectName()
+        style = cls._shared.get(name)
+        if style is None:
+            style = cls(QtWidgets.QStyleFactory.create(name),
+                        QtGui.QPixmap(f"{assets_path}/{cls.arrow_file}"))
+            style.setParent(app)  # destroy along with application
+            cls._shared[name] = style
+        return style
+
+    def _arrow_rect(self, widget):
+        "Centered square in menu button part of `widget` (cached by size)"
+        key = widget.width(), widget.height()
+        rc = self._arrow_rects.get(key)
+        if rc is None:
+            opt_ = QtWidgets.QStyleOptionToolButton()
+            widget.initStyleOption(opt_)
+            rc = super().subControlRect(self.ComplexControl.CC_ToolButton, opt_,
+                                        self.SubControl.SC_ToolButtonMenu, widget)
+            self._arrow_rects.put(key, rc)
+        return rc
+
+    def _arrow_pixmap(self, size: QtCore.QSize, dpr):
+        "`arrow_pix` scaled to `size` once"
+        key = size.width(), size.height(), dpr
+        pix = self._arrow_pixmaps.get(key)
+        if pix is None:
+            pix = self.arrow_pix.scaled(
+                size * dpr, Qt.AspectRatioMode.IgnoreAspectRatio,
+                Qt.TransformationMode.SmoothTransformation)
+            pix.setDevicePixelRatio(dpr)
+            self._arrow_pixmaps.put(key, pix)
+        return pix
 
     def drawPrimitive(self, pe, opt, p: QtGui.QPainter, widget):
         # QToolButton elements:
@@ -432,23 +945,19 @@ class StyleProxy(QtWidgets.QProxyStyle):
             ):
             pe = self.PrimitiveElement.PE_IndicatorArrowDown  # see below
         if pe == self.PrimitiveElement.PE_IndicatorArrowDown:
-            opt_ = QtWidgets.QStyleOptionToolButton()
-            widget.initStyleOption(opt_)
-            rc = super().subControlRect(self.ComplexControl.CC_ToolButton, opt_,
-                                        self.SubControl.SC_ToolButtonMenu, widget)
+            rc = self._arrow_rect(widget)
             if self.stylename in self.win_modern:
                 # By default PE_IndicatorButtonDropDown draws arrow along
                 # with right button art. Draw 2px clipped left part instead
-                path = QtGui.QPainterPath()
-                path.addRect(QtCore.QRectF(rc))
-                p.setClipPath(path)
+                p.setClipRect(rc)
                 super().drawPrimitive(self.PrimitiveElement.PE_PanelButtonTool,
                                       opt, p, widget)
             # centered square
-            rc.moveTop(int((rc.height() - rc.width()) / 2))
-            rc.setHeight(rc.width())
+            side = rc.width()
+            top = int((rc.height() - side) / 2)
             # p.setRenderHint(p.Antialiasing)
-            p.drawPixmap(rc, self.arrow_pix, QtCore.QRect())
+            p.drawPixmap(rc.left(), top, self._arrow_pixmap(
+                QtCore.QSize(side, side), p.device().devicePixelRatioF()))
         else:
             super().drawPrimitive(pe, opt, p, widget)
 
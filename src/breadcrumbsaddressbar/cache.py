@@ -0,0 +1,259 @@
+"Bounded caches for directory listings and other filesystem data"
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+from qtpy import QtCore
+
+from .listing import Listing
+
+
+class LRUCache:
+    """
+    Mapping with least-recently-used eviction.
+    `max_entries` - maximum count of stored values
+    `hits`, `misses` - lookup counters which help to tune cache size
+    """
+    def __init__(self, max_entries=128):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        "Get value by `key` and mark it as recently used"
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        "Store `value`, evict least recently used values if limits exceeded"
+        self.pop(key)
+        self._data[key] = value
+        self._added(key, value)
+        while len(self._data) > 1 and self._overflow():
+            self.pop(next(iter(self._data)))
+
+    def pop(self, key, default=None):
+        "Remove value by `key` and return it"
+        if key not in self._data:
+            return default
+        value = self._data.pop(key)
+        self._removed(key, value)
+        return value
+
+    def clear(self):
+        "Remove all values, reset counters"
+        for key in list(self._data):
+            self.pop(key)
+        self.hits = self.misses = 0
+
+    def stats(self):
+        "Cache statistics: hits, misses and count of entries"
+        return dict(hits=self.hits, misses=self.misses, entries=len(self))
+
+    def _overflow(self):
+        "Check if limits are exceeded"
+        return len(self._data) > self.max_entries
+
+    def _added(self, key, value):
+        "Called after `value` is stored"
+
+    def _removed(self, key, value):
+        "Called after `value` is removed or evicted"
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ListingCache(LRUCache):
+    """
+    Cache of directory listings limited by count of listings and by
+    approximate memory usage `max_bytes`. Listings are dropped as soon as
+    `QFileSystemWatcher` reports a change in a directory.
+    Connect to `watcher.directoryChanged` to get notified about invalidation.
+    `watch` - watch local directories; False for listings of other
+              filesystems, they should be checked by `Listing.mtime`
+    """
+    def __init__(self, max_entries=32, max_bytes=16 * 2**20, watch=True):
+        super().__init__(max_entries)
+        self.max_bytes = max_bytes
+        self.watch = watch
+        self.bytes = 0
+        self._sizes = {}
+        self.watcher = QtCore.QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self._directory_changed)
+
+    @staticmethod
+    def sizeof(listing):
+        "Approximate memory used by `listing` (see `Listing.nbytes`)"
+        return listing.nbytes()
+
+    def put(self, key, value):
+        """
+        Store listing of `key` directory. Returns False if the directory has
+        been modified since it was listed (`Listing.mtime`) and before it
+        has been watched: such listing is outdated and is not stored.
+        """
+        super().put(key, value)
+        if self.watch and value.mtime is not None and key in self and \
+                self.mtime(key) != value.mtime:
+            self.pop(key)
+            return False
+        return True
+
+    @staticmethod
+    def mtime(path):
+        "Modification time of local directory, see `LocalProvider.mtime`"
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def stats(self):
+        return dict(super().stats(), bytes=self.bytes)
+
+    def _overflow(self):
+        return super()._overflow() or self.bytes > self.max_bytes
+
+    def _added(self, key, value):
+        self._sizes[key] = size = self.sizeof(value)
+        self.bytes += size
+        if self.watch:
+            self.watcher.addPath(str(key))
+
+    def _removed(self, key, value):
+        self.bytes -= self._sizes.pop(key)
+        if self.watch:
+            self.watcher.removePath(str(key))
+
+    def _directory_changed(self, path):
+        "SLOT: directory contents changed or it was removed"
+        self.pop(Path(path))
+
+
+class DiskListingCache:
+    """
+    Persistent cache of directory listings in SQLite database, e.g. to
+    complete paths at once in a new session. Listings are stored along
+    with modification time of directory to check if they are outdated.
+    Least recently used listings are evicted when limits are exceeded.
+    `path` - database file, default - "listings.sqlite" in user cache dir
+    `max_entries` - maximum count of stored listings
+    `max_bytes` - maximum size of stored (compressed) listings
+    Methods are thread-safe.
+    """
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, path=None, max_entries=1000, max_bytes=64 * 2**20):
+        if path is None:
+            QSP = QtCore.QStandardPaths
+            path = Path(QSP.writableLocation(QSP.CacheLocation),
+                        "listings.sqlite")
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=5,
+                                   check_same_thread=False,
+                                   isolation_level=None)  # autocommit
+        self._db.execute("PRAGMA journal_mode=WAL")  # for many processes
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS listings (scope TEXT, path TEXT, "
+            "mtime, used REAL, size INTEGER, names BLOB, flags BLOB, "
+            "PRIMARY KEY (scope, path))")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS listings_used ON listings (used)")
+
+    @classmethod
+    def instance(cls):
+        "Cache in default location shared by all address bars"
+        with cls._instance_lock:
+            if cls._instance is None:
+                cls._instance = cls()
+            return cls._instance
+
+    def get(self, path, scope=''):
+        """
+        Listing of `path` directory stored with `put` (`Listing.mtime` is
+        set), None if not found. `scope` - e.g. filesystem and filter
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT mtime, names, flags FROM listings "
+                "WHERE scope = ? AND path = ?", (scope, str(path))).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._db.execute(
+                "UPDATE listings SET used = ? WHERE scope = ? AND path = ?",
+                (time.time(), scope, str(path)))
+        mtime, names, flags = row
+        names = zlib.decompress(names).decode('utf-8', 'surrogatepass')
+        listing = Listing(path, names.split('\0') if names else (), flags)
+        listing.mtime = mtime
+        return listing
+
+    def put(self, path, scope, listing):
+        "Store `listing` of `path` along with its `mtime`, evict old listings"
+        names = zlib.compress('\0'.join(listing.names).encode(
+            'utf-8', 'surrogatepass'), 1)
+        flags = bytes(listing.flags)
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (scope, str(path), listing.mtime, time.time(),
+                 len(names) + len(flags), names, flags))
+            self._evict()
+
+    def pop(self, path, scope=''):
+        "Remove listing of `path`"
+        with self._lock:
+            self._db.execute(
+                "DELETE FROM listings WHERE scope = ? AND path = ?",
+                (scope, str(path)))
+
+    def clear(self):
+        "Remove all listings, reset counters"
+        with self._lock:
+            self._db.execute("DELETE FROM listings")
+            self.hits = self.misses = 0
+
+    def stats(self):
+        "Cache statistics: hits, misses, count and size of listings"
+        with self._lock:
+            entries, size = self._db.execute(
+                "SELECT COUNT(*), TOTAL(size) FROM listings").fetchone()
+        return dict(hits=self.hits, misses=self.misses, entries=entries,
+                    bytes=int(size))
+
+    def _evict(self):
+        "Remove least recently used listings while limits are exceeded"
+        count, size = self._db.execute(
+            "SELECT COUNT(*), TOTAL(size) FROM listings").fetchone()
+        stale = []
+        for rowid, row_size in self._db.execute(
+                "SELECT rowid, size FROM listings ORDER BY used"):
+            if count <= 1 or (count <= self.max_entries and
+                              size <= self.max_bytes):
+                break
+            stale.append((rowid,))
+            count -= 1
+            size -= row_size
+        self._db.executemany("DELETE FROM listings WHERE rowid = ?", stale)
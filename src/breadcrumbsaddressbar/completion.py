@@ -0,0 +1,206 @@
+"Ranked file name completion"
+
+import os
+import re
+from bisect import bisect_left
+from pathlib import Path
+
+from qtpy import QtCore
+from qtpy.QtCore import Qt
+
+from .listing import Listing
+
+SEPARATORS = {os.path.sep, '/'}
+
+
+class CompletionIndex:
+    """
+    Casefolded names of a `Listing` sorted once for `bisect` prefix lookup.
+    Substring and subsequence (fuzzy) matching scan names linearly and are
+    used to rank the rest of the results.
+    `start`, `stop` - index only a range of listing rows
+    """
+    def __init__(self, listing: Listing, start=0, stop=None):
+        self.start = start
+        self.names = [i.casefold() for i in listing.names[start:stop]]
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.keys = [self.names[i] for i in order]
+        self.rows = order
+
+    def prefix_rows(self, text):
+        "Positions (rows - `start`) of names starting with `text` in order"
+        start = bisect_left(self.keys, text)
+        end = bisect_left(self.keys, text + '\U0010ffff', start)
+        return sorted(self.rows[start:end])
+
+    def query(self, text, fuzzy=True):
+        """
+        Ranked rows of names matching `text` (case-insensitive):
+        exact name, names starting with `text`, then if `fuzzy` is set
+        names containing `text` and names containing its letters in order
+        """
+        rows = self._ranked(text.casefold(), fuzzy)
+        return [self.start + i for i in rows] if self.start else rows
+
+    def _ranked(self, text, fuzzy):
+        if not text:
+            return list(range(len(self.names)))
+        rows = self.prefix_rows(text)
+        exact = [i for i in rows if self.names[i] == text]
+        if exact:
+            rows = exact + [i for i in rows if i not in exact]
+        if not fuzzy:
+            return rows
+        found = set(rows)
+        substr, subseq = [], []
+        pattern = re.compile('.*?'.join(map(re.escape, text)))
+        for row, name in enumerate(self.names):
+            if row in found:
+                continue
+            if text in name:
+                substr.append(row)
+            elif match := pattern.search(name):
+                subseq.append((match.end() - match.start(), row))
+        subseq.sort()
+        return rows + substr + [row for _span, row in subseq]
+
+
+class CompletionModel(QtCore.QAbstractListModel):
+    """
+    Ranked completions of the last path component from `FilenameModel`.
+    Used with `QCompleter.UnfilteredPopupCompletion`: `set_prefix` filters
+    entries with `CompletionIndex`, which is rebuilt once per listing.
+    Entries appended by `fetchMore` (streaming) are matched separately and
+    their results are appended, already shown rows are not reordered.
+    Chunks w/o matches add no rows, so views would not fetch more: next
+    chunk is fetched until a match is found or directory is read.
+    `request_prefix` coalesces edits: only the latest prefix is listed and
+    filtered after `delay` ms of idle time, then `prefix_applied` is emitted.
+    """
+    prefix_applied = QtCore.Signal()
+
+    def __init__(self, source, parent=None, fuzzy=True, delay=0):
+        super().__init__(parent)
+        self.source = source
+        self.fuzzy = fuzzy
+        self.prefix = ''
+        self._requested_prefix = ''
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self._apply_prefix)
+        self._fetch_timer = QtCore.QTimer(self)  # see `_fetch_matches`
+        self._fetch_timer.setSingleShot(True)
+        self._fetch_timer.setInterval(0)
+        self._fetch_timer.timeout.connect(self._fetch_matches)
+        self._rows = []
+        self._positions = None  # source row: row, see `_source_data_changed`
+        self._index = None
+        source.modelReset.connect(self._source_changed)
+        source.rowsInserted.connect(self._source_rows_inserted)
+        source.dataChanged.connect(self._source_data_changed)
+
+    def delay(self):
+        "Idle time in ms before edited prefix is applied"
+        return self._timer.interval()
+
+    def set_delay(self, delay):
+        self._timer.setInterval(delay)
+
+    def request_prefix(self, prefix):
+        "SLOT: list directory and show completions of `prefix` after a delay"
+        self._requested_prefix = prefix
+        if self._timer.interval() > 0:
+            self._timer.start()  # restart on every edit
+        else:
+            self._apply_prefix()
+
+    def _apply_prefix(self):
+        prefix = self._requested_prefix
+        self.source.setPathPrefix(prefix)
+        self.set_prefix(prefix)
+        self.prefix_applied.emit()
+
+    def set_prefix(self, prefix):
+        "SLOT: show completions of path `prefix`"
+        self.prefix = prefix
+        self.beginResetModel()
+        self._rows = self._query(prefix)
+        self._positions = None
+        self.endResetModel()
+        if not self._rows:
+            self._fetch_timer.start()
+
+    def _name(self, prefix):
+        "Last component of `prefix`, None if its directory is not listed"
+        listing = self.source.listing()
+        if not prefix or listing.path is None:
+            return None
+        name = '' if prefix[-1] in SEPARATORS else Path(prefix).name
+        if Path(prefix[:len(prefix) - len(name)]) != listing.path:
+            return None  # directory is not listed yet
+        return name
+
+    def _query(self, prefix):
+        "Rows of source model which match the last component of `prefix`"
+        name = self._name(prefix)
+        if name is None:
+            return []
+        if self._index is None:
+            self._index = CompletionIndex(self.source.listing())
+        return self._index.query(name, self.fuzzy)
+
+    def _source_changed(self):
+        "SLOT: listing is changed, rebuild index and results"
+        self._index = None
+        self.set_prefix(self.prefix)
+
+    def _source_rows_inserted(self, parent, first, last):
+        "SLOT: entries are appended (streaming), append matching ones"
+        self._index = None
+        name = self._name(self.prefix)
+        if name is None:
+            return
+        rows = CompletionIndex(self.source.listing(), first, last + 1).query(
+            name, self.fuzzy)
+        if not rows:
+            self._fetch_timer.start()
+            return
+        count = len(self._rows)
+        self.beginInsertRows(QtCore.QModelIndex(), count,
+                             count + len(rows) - 1)
+        self._rows.extend(rows)
+        self._positions = None
+        self.endInsertRows()
+
+    def _fetch_matches(self):
+        "SLOT: read next chunk of listed directory, no matches were found"
+        if self._name(self.prefix) is not None and self.canFetchMore():
+            self.fetchMore()
+
+    def _source_data_changed(self, top_left, bottom_right, roles=()):
+        "SLOT: e.g. icons are resolved, update rows of affected entries"
+        if not self._rows:
+            return
+        if self._positions is None:
+            self._positions = {row: i for i, row in enumerate(self._rows)}
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            i = self._positions.get(row)
+            if i is not None:
+                index = self.index(i, 0)
+                self.dataChanged.emit(index, index, roles)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        return self.source.data(self.source.index(self._rows[index.row()], 0),
+                                role)
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return self.source.canFetchMore(parent)
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        self.source.fetchMore(parent)
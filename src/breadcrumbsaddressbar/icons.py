@@ -0,0 +1,129 @@
+"File icons shared by entries of the same kind"
+
+import os
+
+from qtpy import QtCore, QtGui, QtWidgets
+from qtpy.QtCore import Qt
+
+from . import metrics
+from .cache import LRUCache
+
+TRANSP_ICON_SIZE = 40, 40  # px, size of generated semi-transparent icons
+# Files of these types may have own icons, see also `QWindowsTheme::fileIcon`
+UNIQUE_ICON_SUFFIXES = ("exe", "lnk", "ico", "url", "")
+
+
+def icon_key(fileinfo: QtCore.QFileInfo, dpr=None):
+    """
+    Icon identity of an entry: entries with equal keys share an icon.
+    Key includes kind (root, folder, file type), hidden flag and
+    device pixel ratio. Drives and some file types are keyed by path,
+    so are folders on Windows (Desktop, Documents, `desktop.ini`...).
+    Pass `dpr` to call this function from a non-GUI thread.
+    """
+    if fileinfo.isRoot():
+        kind = 'root', fileinfo.absoluteFilePath()
+    elif fileinfo.isDir():
+        if os.name == 'nt':  # folders may have custom icons
+            kind = 'dir', fileinfo.absoluteFilePath()
+        else:
+            kind = 'dir', fileinfo.isSymLink()
+    else:
+        suffix = fileinfo.suffix().lower()
+        if suffix in UNIQUE_ICON_SUFFIXES:
+            kind = 'file', fileinfo.absoluteFilePath()
+        else:
+            kind = 'type', suffix, fileinfo.isSymLink()
+    if dpr is None:
+        dpr = QtGui.QGuiApplication.instance().devicePixelRatio()
+    return kind, fileinfo.isHidden(), dpr
+
+
+def generic_icon_key(kind, suffix='', hidden=False, dpr=None):
+    """
+    Icon key of an entry of any filesystem, e.g. of `FSProvider`.
+    `kind` - 'folder', 'file' (icon is chosen by name `suffix`) or 'drive'.
+    Icons of such keys are resolved w/o filesystem access.
+    """
+    if dpr is None:
+        dpr = QtGui.QGuiApplication.instance().devicePixelRatio()
+    return ('generic', kind, suffix.lower()), hidden, dpr
+
+
+def generic_icon(provider: QtWidgets.QFileIconProvider, kind, suffix=''):
+    "Icon of entry `kind` (see `generic_icon_key`) w/o filesystem access"
+    IconType = QtWidgets.QFileIconProvider.IconType
+    if kind == 'folder':
+        return provider.icon(IconType.Folder)
+    if kind == 'drive':
+        return provider.icon(IconType.Drive)
+    fallback = provider.icon(IconType.File)
+    if not suffix:
+        return fallback
+    mime = QtCore.QMimeDatabase().mimeTypeForFile(
+        "file." + suffix, QtCore.QMimeDatabase.MatchMode.MatchExtension)
+    return QtGui.QIcon.fromTheme(mime.iconName(), QtGui.QIcon.fromTheme(
+        mime.genericIconName(), fallback))
+
+
+def translucent_icon(icon: QtGui.QIcon, dpr=1.0):
+    "Generate semi-transparent version of `icon` (for hidden entries)"
+    pmap = QtGui.QPixmap(*(int(i * dpr) for i in TRANSP_ICON_SIZE))
+    pmap.setDevicePixelRatio(dpr)
+    pmap.fill(Qt.transparent)
+    painter = QtGui.QPainter(pmap)
+    painter.setOpacity(0.5)
+    icon.paint(painter, 0, 0, *TRANSP_ICON_SIZE)
+    painter.end()
+    return QtGui.QIcon(pmap)
+
+
+class IconCache(LRUCache):
+    """
+    Icons of filesystem entries cached by `icon_key`.
+    `provider` - QFileIconProvider used on cache miss
+    `max_paths` - max count of icons keyed by path (drives, executables,
+                  folders on Windows) stored in `paths`, so that listing
+                  a big folder does not evict icons of file types
+    """
+    def __init__(self, provider=None, max_entries=256, max_paths=256):
+        super().__init__(max_entries)
+        self.provider = provider or QtWidgets.QFileIconProvider()
+        self.paths = LRUCache(max_paths)
+
+    @staticmethod
+    def _by_path(key):
+        "Check if icon of `key` belongs to a single path"
+        kind = key[0]
+        return kind[0] in ('root', 'dir', 'file') and isinstance(kind[1], str)
+
+    def _cache(self, key):
+        return self.paths if self._by_path(key) else super()
+
+    def icon(self, path, key=None):
+        """
+        Path -> QIcon. Filesystem is not accessed if `key` is known and
+        cached or if it is a `generic_icon_key`
+        """
+        icon = None if key is None else self._cache(key).get(key)
+        if icon is not None:
+            metrics.count('icon_cache_hit')
+            return icon
+        if key is None:
+            key = icon_key(QtCore.QFileInfo(str(path)))
+            icon = self._cache(key).get(key)
+        if icon is None:
+            metrics.count('icon_cache_miss')
+            with metrics.timed('icon', path=path):
+                kind = key[0]
+                if kind[0] == 'generic':
+                    icon = generic_icon(self.provider, *kind[1:])
+                else:
+                    icon = self.provider.icon(QtCore.QFileInfo(str(path)))
+                _kind, hidden, dpr = key
+                if hidden:
+                    icon = translucent_icon(icon, dpr)
+            self._cache(key).put(key, icon)
+        else:
+            metrics.count('icon_cache_hit')
+        return icon
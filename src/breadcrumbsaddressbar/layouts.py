@@ -1,6 +1,11 @@
+from bisect import bisect_right
+from itertools import accumulate
+
 from qtpy import QtCore, QtWidgets
 from qtpy.QtCore import Qt
 
+from . import metrics
+
 class LeftHBoxLayout(QtWidgets.QHBoxLayout):
     '''
     Left aligned horizontal layout.
@@ -8,10 +13,14 @@ class LeftHBoxLayout(QtWidgets.QHBoxLayout):
     '''
     # Signal is emitted when an item is hidden/shown or removed with `takeAt`
     widget_state_changed = QtCore.Signal(object, bool)
+    # Signal is emitted once per layout pass with lists of hidden and shown
+    # widgets
+    widgets_state_changed = QtCore.Signal(list, list)
 
     def __init__(self, parent=None, minimal_space=0.1):
         super().__init__(parent)
         self.first_visible = 0
+        self._widths = None  # total widths of 1, 2, ... rightmost items
         self.set_space_widget()
         self.set_minimal_space(minimal_space)
 
@@ -32,24 +41,43 @@ class LeftHBoxLayout(QtWidgets.QHBoxLayout):
 
     def setGeometry(self, rc:QtCore.QRect):
         "`rc` - layout's rectangle w/o margins"
-        super().setGeometry(rc)  # perform the layout
+        with metrics.timed('layout_pass', width=rc.width()):
+            first_visible = self._fit(rc.width())
+            hidden = [self[i].widget() for i in range(self.first_visible, first_visible)]
+            shown = [self[i].widget() for i in range(first_visible, self.first_visible)]
+            self.first_visible = first_visible
+            self.setEnabled(False)  # `show` would activate layout for each widget
+            for widget in hidden:
+                widget.hide()
+            for widget in shown:
+                widget.show()
+            self.setEnabled(True)
+            super().setGeometry(rc)  # perform the layout
+            for widget in hidden:
+                self.widget_state_changed.emit(widget, False)
+            for widget in shown:
+                self.widget_state_changed.emit(widget, True)
+            if hidden or shown:
+                self.widgets_state_changed.emit(hidden, shown)
+
+    def _fit(self, width):
+        "Index of the first item visible in `width` px, at least one is visible"
+        count = self.count()
+        if not count:
+            return 0
+        if self._widths is None:
+            spacing = max(self.spacing(), 0)
+            self._widths = list(accumulate(
+                max(self[i].widget().sizeHint().width(),
+                    self[i].widget().minimumWidth()) + spacing
+                for i in range(count - 1, -1, -1)))
         min_sp = self.minimal_space()
         if min_sp < 1:  # percent
-            min_sp *= rc.width()
-        free_space = self[self.count()].geometry().width() - min_sp
-        if free_space < 0 and self.count_visible() > 1:  # hide more items
-            widget = self[self.first_visible].widget()
-            widget.hide()
-            self.first_visible += 1
-            self.widget_state_changed.emit(widget, False)
-        elif free_space > 0 and self.count_hidden():  # show more items
-            widget = self[self.first_visible-1].widget()
-            w_width = widget.width() + self.spacing()
-            if w_width <= free_space:  # enough space to show next item
-                # setGeometry is called after show
-                QtCore.QTimer.singleShot(0, widget.show)
-                self.first_visible -= 1
-                self.widget_state_changed.emit(widget, True)
+            min_sp *= width
+        margins = self.contentsMargins()
+        available = width - margins.left() - margins.right() - min_sp
+        fit = bisect_right(self._widths, available)  # count of items
+        return count - max(fit, 1)
 
     def count_visible(self):
         "Count of visible widgets"
@@ -67,9 +95,19 @@ class LeftHBoxLayout(QtWidgets.QHBoxLayout):
     def addWidget(self, widget, stretch=0, alignment=None):
         "Append widget to layout, make its width fixed"
         # widget.setMinimumSize(widget.minimumSizeHint())  # FIXME:
-        super().insertWidget(self.count(), widget, stretch,
+        self.insertWidget(self.count(), widget, stretch,
+                          alignment or Qt.Alignment(0))
+
+    def insertWidget(self, index, widget, stretch=0, alignment=None):
+        self._widths = None
+        super().insertWidget(index, widget, stretch,
                              alignment or Qt.Alignment(0))
 
+    def invalidate(self):
+        "Size hints of items may have changed (font, style, DPI)"
+        self._widths = None
+        super().invalidate()
+
     def count(self, visible=None):
         "Count of items in layout: `visible`=True|False(hidden)|None(all)"
         cnt = super().count() - 1  # w/o last stretchable item
@@ -109,6 +147,7 @@ class LeftHBoxLayout(QtWidgets.QHBoxLayout):
         "Return an item at the specified `index` and remove it from layout"
         if index < self.first_visible:
             self.first_visible -= 1
+        self._widths = None
         item = super().takeAt(index)
         self.widget_state_changed.emit(item.widget(), False)
         return item
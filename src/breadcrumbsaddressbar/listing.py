@@ -0,0 +1,147 @@
+"Compact directory listing storage"
+
+import locale
+import os
+import re
+import stat
+import sys
+
+IS_DIR = 1  # entry flags
+IS_HIDDEN = 2
+
+_split_digits = re.compile(r'(\d+)').split
+
+
+def _is_hidden(entry: os.DirEntry):
+    "Check hidden attribute (Windows, cached by `scandir`) or leading dot"
+    if os.name == 'nt':
+        return bool(entry.stat().st_file_attributes &
+                    stat.FILE_ATTRIBUTE_HIDDEN)
+    return entry.name.startswith('.')
+
+
+def scan_entries(path, dirs_only=False):
+    """
+    Generate (name, flags) entries of `path` directory in directory order.
+    `os.scandir` provides entry type and attributes w/o extra `stat` calls
+    on most platforms.
+    """
+    with os.scandir(path) as it:
+        for entry in it:
+            try:
+                flags = IS_DIR if entry.is_dir() else 0
+            except OSError:  # e.g. broken link
+                flags = 0
+            if dirs_only and not flags:
+                continue
+            if _is_hidden(entry):
+                flags |= IS_HIDDEN
+            yield entry.name, flags
+
+
+def sort_key(name, transform=None):
+    """
+    Natural case-insensitive sort key: numbers are compared by value
+    ("file 2" < "file 10"). Digit runs are replaced with their length and
+    digits, so keys are plain strings which are fast to compare.
+    `transform` - e.g. `locale.strxfrm` to compare text locale-aware
+    """
+    parts = _split_digits(name.casefold())
+    for i in range(1, len(parts), 2):
+        digits = parts[i].lstrip('0') or '0'
+        parts[i] = '%02d%s' % (min(len(digits), 99), digits)
+    key = ''.join(parts)
+    return key if transform is None else transform(key)
+
+
+def collation_transform():
+    "`locale.strxfrm` if collation locale is set (Qt sets it on Unix)"
+    name = locale.setlocale(locale.LC_COLLATE)
+    if name.split('.')[0] in ('C', 'POSIX'):
+        return None  # code point order
+    return locale.strxfrm
+
+
+class Listing:
+    """
+    Entries of a directory: parent path is stored once, names and flags
+    (`IS_DIR`, `IS_HIDDEN`) are stored in parallel arrays.
+    `keys` - `sort_key` of names after `sort`, None if not sorted
+    `mtime` - modification time of directory before it was listed (see
+              `FSProvider.mtime`), None if unknown
+    """
+    __slots__ = ('path', 'prefix', 'names', 'flags', 'keys', 'mtime')
+
+    def __init__(self, path=None, names=(), flags=b''):
+        self.path = path
+        self.prefix = ''  # path with trailing separator
+        if path is not None:
+            self.prefix = str(path)
+            if not self.prefix.endswith(os.path.sep):
+                self.prefix += os.path.sep
+        self.names = list(names)
+        self.flags = bytearray(flags)
+        self.keys = None
+        self.mtime = None
+
+    @classmethod
+    def from_entries(cls, path, entries):
+        "Create listing from (name, flags) pairs"
+        listing = cls(path)
+        for name, flags in entries:
+            listing.append(name, flags)
+        return listing
+
+    def entries(self):
+        "Iterate over (name, flags) pairs"
+        return zip(self.names, self.flags)
+
+    def append(self, name, flags):
+        self.names.append(name)
+        self.flags.append(flags)
+        self.keys = None
+
+    def sort(self, previous=None):
+        """
+        Sort entries naturally (see `sort_key`), folders first. Keys are
+        computed once per name: keys of `previous` listing of the directory
+        are reused, so re-sorting after a change processes only new names.
+        Returns the listing.
+        """
+        known = {}
+        if previous is not None and previous.keys is not None:
+            known = dict(zip(previous.names, previous.keys))
+        transform = collation_transform()
+        keys = [known.get(i) or sort_key(i, transform) for i in self.names]
+        by_key = keys.__getitem__
+        order = (sorted((i for i, f in enumerate(self.flags) if f & IS_DIR),
+                        key=by_key) +
+                 sorted((i for i, f in enumerate(self.flags) if not f & IS_DIR),
+                        key=by_key))
+        names = self.names
+        self.names = [names[i] for i in order]
+        self.flags = bytearray(self.flags[i] for i in order)
+        self.keys = [keys[i] for i in order]
+        return self
+
+    def full_path(self, row):
+        "Path of entry as a string"
+        return self.prefix + self.names[row]
+
+    def is_dir(self, row):
+        return bool(self.flags[row] & IS_DIR)
+
+    def is_hidden(self, row):
+        return bool(self.flags[row] & IS_HIDDEN)
+
+    def nbytes(self):
+        "Approximate memory used by listing"
+        size = (sys.getsizeof(self.names) + sum(map(sys.getsizeof, self.names)) +
+                sys.getsizeof(self.flags) + sys.getsizeof(self.prefix))
+        if self.keys is not None:
+            size += (sys.getsizeof(self.keys) +
+                     sum(map(sys.getsizeof, self.keys)))
+        return size
+
+    def __len__(self):
+        return len(self.names)
@@ -0,0 +1,83 @@
+"""
+Opt-in timing and counter hooks for hot paths.
+Metrics are passed to sinks added with `add_sink`: callables
+`sink(name, kind, value, tags)`, where `kind` is 'time' (`value` in ms)
+or 'count'. Sinks may be called from worker threads, use `SignalSink`
+to receive metrics in the GUI thread. Hooks do nothing w/o sinks.
+Tag values are passed as is (e.g. `Path`), so that nothing is formatted
+w/o sinks: convert them in sinks if needed.
+
+    with metrics.timed('listing', path=path):
+        ...
+    metrics.count('icon_cache_miss')
+"""
+
+import time
+from contextlib import nullcontext
+
+from qtpy import QtCore
+
+_sinks = ()  # replaced, not mutated: read w/o locks from any thread
+_null_timer = nullcontext()
+
+
+def add_sink(sink):
+    "Start passing metrics to `sink(name, kind, value, tags)`"
+    global _sinks
+    _sinks = _sinks + (sink,)
+
+
+def remove_sink(sink):
+    global _sinks
+    _sinks = tuple(i for i in _sinks if i != sink)
+
+
+def enabled():
+    "Check if there are sinks, e.g. to skip preparing tags"
+    return bool(_sinks)
+
+
+def emit(name, kind, value, tags):
+    for sink in _sinks:
+        sink(name, kind, value, tags)
+
+
+def count(name, value=1, **tags):
+    "Report counter increment"
+    if _sinks:
+        emit(name, 'count', value, tags)
+
+
+class _Timer:
+    "Context manager reporting time of a block in ms"
+    __slots__ = ('name', 'tags', 'start')
+
+    def __init__(self, name, tags):
+        self.name = name
+        self.tags = tags
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        emit(self.name, 'time', (time.perf_counter() - self.start) * 1000,
+             self.tags)
+
+
+def timed(name, **tags):
+    "Time `with` block, shared no-op context manager is returned w/o sinks"
+    if not _sinks:
+        return _null_timer
+    return _Timer(name, tags)
+
+
+class SignalSink(QtCore.QObject):
+    """
+    Sink which emits `metric` signal (queued to receivers in other threads)
+    Usage: `metrics.add_sink(sink)`
+    """
+    metric = QtCore.Signal(str, str, float, object)  # name, kind, value, tags
+
+    def __call__(self, name, kind, value, tags):
+        self.metric.emit(name, kind, value, tags)
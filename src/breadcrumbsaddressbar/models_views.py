@@ -1,89 +1,571 @@
 import os.path
+import time
+from functools import partial
+from itertools import chain, islice
 from pathlib import Path
-from qtpy import QtCore, QtWidgets
+from qtpy import QtCore, QtGui, QtWidgets
 from qtpy.QtCore import Qt
 
-class FilenameModel(QtCore.QStringListModel):
+from . import metrics
+from .icons import generic_icon, generic_icon_key
+from .cache import ListingCache, LRUCache
+from .listing import IS_DIR, IS_HIDDEN, Listing, scan_entries
+from .providers import FSProvider, LocalProvider
+
+# Entries starting with a dot are hidden (except on Windows)
+dot_hidden = os.name != 'nt'
+_listing_pool = None  # see `FilenameModel.listing_pool`
+
+
+class _ListingSignals(QtCore.QObject):
+    "Delivers results of `_ListingTask` to the GUI thread"
+    # ticket, path, list of entries (None if listing failed)
+    finished = QtCore.Signal(int, object, object)
+
+
+class _ListingTask(QtCore.QRunnable):
+    """
+    List a directory in `QThreadPool`.
+    Listing is skipped if `is_current(ticket)` returns False, i.e. a newer
+    listing has been requested meanwhile. `finished` is emitted anyway
+    (with None listing if skipped or failed), receivers check the ticket.
+    """
+    def __init__(self, func, exists, path, ticket, is_current, signals):
+        super().__init__()
+        self.func = func
+        self.exists = exists
+        self.path = path
+        self.ticket = ticket
+        self.is_current = is_current
+        self.signals = signals
+
+    def run(self):
+        lst = None
+        if self.is_current(self.ticket):  # not cancelled before start
+            try:
+                lst = self.func(self.path) if self.exists(self.path) else None
+            except OSError:
+                pass
+        self.signals.finished.emit(self.ticket, self.path, lst)
+
+
+class _IconKeysSignals(QtCore.QObject):
+    "Delivers results of `_IconKeysTask` to the GUI thread"
+    finished = QtCore.Signal(int, object)  # listing id, [(row, path, key), ...]
+
+
+class _IconKeysTask(QtCore.QRunnable):
+    "Get icon keys of (row, path) items in `QThreadPool`"
+    def __init__(self, icon_hint, items, dpr, listing_id, signals):
+        super().__init__()
+        self.icon_hint = icon_hint
+        self.items = items
+        self.dpr = dpr
+        self.listing_id = listing_id
+        self.signals = signals
+
+    def run(self):
+        with metrics.timed('icon_keys', items=len(self.items)):
+            keys = [(row, path, self.icon_hint(path, self.dpr))
+                    for row, path in self.items]
+        self.signals.finished.emit(self.listing_id, keys)
+
+
+class FilenameModel(QtCore.QAbstractListModel):
     """
     Model used by QCompleter for file name completions.
+    Entries of the current directory are stored in a compact `Listing`:
+    `DisplayRole` is a file name, `EditRole` is a full path.
     Constructor options:
     `filter_` (None, 'dirs') - include all entries or folders only
-    `fs_engine` ('qt', 'pathlib') - enumerate files using `QDir` or `pathlib`
+    `fs_engine` ('qt', 'pathlib', 'scandir', FSProvider) - enumerate files
+                using `QDir`, `pathlib`, `os.scandir` (entry type and
+                attributes are read along with names, no extra `stat` calls)
+                or list them in batches with a provider (see `providers`)
     `icon_provider` (func, 'internal', None) - a function which gets path
                                                and returns QIcon
+    `async_listing` (bool) - list directories in `listing_pool`, model is empty
+                             and `is_loading()` is True until listing finishes
+    `cache` (ListingCache, 'internal', None) - cache of recent listings
+    `lazy_icons` (bool) - return generic folder/file icon first, get icon keys
+                          in `listing_pool` and then call `icon_provider` with
+                          `key` argument (see `IconCache.icon`)
+    `streaming` (bool) - read directory with `os.scandir` (or provider) in
+                         chunks of `fetch_size` entries as views request
+                         them with `fetchMore`; entries are shown in
+                         directory order
+    `exists_ttl` (float) - seconds to cache results of path existence checks
+    `prefetch_jobs` (int) - max count of directories listed at once by
+                            `prefetch`
+    `disk_cache` (DiskListingCache, None) - persistent cache of listings:
+                    a stored listing is shown at once and then checked in
+                    background by modification time of directory; used
+                    only if provider has `cache_scope`
     """
-    def __init__(self, filter_=None, fs_engine='qt', icon_provider='internal'):
+    # Signal is emitted when background listing starts (True) or ends (False)
+    loading_changed = QtCore.Signal(bool)
+    # Signal is emitted when a directory cannot be listed synchronously
+    listdir_error = QtCore.Signal(Path)
+
+    def __init__(self, filter_=None, fs_engine='qt', icon_provider='internal',
+                 async_listing=False, cache='internal', lazy_icons=False,
+                 streaming=False, fetch_size=256, exists_ttl=5.0,
+                 prefetch_jobs=2, disk_cache=None):
         super().__init__()
         self.current_path = None
+        self._listing = Listing()
         self.fs_engine = fs_engine
+        # Existence checks, streaming and icon keys of `lazy_icons`
+        self.provider = (fs_engine if isinstance(fs_engine, FSProvider)
+                         else LocalProvider())
+        # Other filesystems are not watched, icons are chosen by entry type
+        self._local = isinstance(self.provider, LocalProvider)
+        self.cache = (ListingCache(watch=self._local) if cache == 'internal'
+                      else cache)
+        if self.cache is not None:
+            self.cache.watcher.directoryChanged.connect(self._directory_changed)
+        # Listings of local engines are equal, see `FSProvider.cache_scope`
+        scope = self.provider.cache_scope
+        self.disk_cache = disk_cache if scope is not None else None
+        self._disk_scope = '%s:%s' % (scope, filter_)
+        self.exists_ttl = exists_ttl
+        self._exists_cache = LRUCache(256)  # path: (exists, time)
         self.filter = filter_
+        self.async_listing = async_listing
+        self.streaming = streaming
+        self.fetch_size = fetch_size
+        self._scan = None  # generator of entries (`streaming` mode)
+        self._scan_mtime = None  # directory mtime when `_scan` started
+        self._fetching = False
+        self._ticket = 0  # id of the latest listing request
+        self._loading = False
+        self._listing_signals = _ListingSignals(self)
+        self._listing_signals.finished.connect(self._listing_finished)
+        self._revalidation_signals = _ListingSignals(self)
+        self._revalidation_signals.finished.connect(self._revalidated)
+        self.prefetch_jobs = prefetch_jobs
+        self._prefetch_queue = []  # paths to be listed, the first is next
+        self._prefetch_ticket = 0  # queued tasks of older requests are skipped
+        self._prefetch_running = 0
+        self._prefetch_signals = _ListingSignals(self)
+        self._prefetch_signals.finished.connect(self._prefetch_finished)
         if icon_provider == 'internal':
             self.icons = QtWidgets.QFileIconProvider()
             self.icon_provider = self.get_icon
         else:
             self.icon_provider = icon_provider
+        self.lazy_icons = lazy_icons
+        self._listing_id = 0  # changes every time model is filled
+        self._resolved_icons = {}  # row: QIcon of the current listing
+        self._pending_icons = set()  # rows, icon keys to be requested
+        self._requested_icons = set()  # rows
+        self._placeholder_icons = {}  # is_dir: QIcon
+        self._icon_timer = QtCore.QTimer(self)
+        self._icon_timer.setSingleShot(True)
+        self._icon_timer.timeout.connect(self._request_icon_keys)
+        self._icon_keys_signals = _IconKeysSignals(self)
+        self._icon_keys_signals.finished.connect(self._icon_keys_ready)
+
+    @staticmethod
+    def listing_pool():
+        """
+        Thread pool for listings and icon keys: requests to hung mounts may
+        never return, they should not block the application-wide pool.
+        At most 4 tasks run at once, later ones wait while they hang.
+        """
+        global _listing_pool
+        if _listing_pool is None:
+            _listing_pool = QtCore.QThreadPool()
+            _listing_pool.setMaxThreadCount(4)
+        return _listing_pool
 
-    def data(self, index, role):
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._listing)
+
+    def data(self, index, role=Qt.DisplayRole):
         "Get names/icons of files"
-        default = super().data(index, role)
-        if role == Qt.DecorationRole and self.icon_provider:
-            # self.setData(index, dat, role)
-            return self.icon_provider(super().data(index, Qt.DisplayRole))
+        if not index.isValid():
+            return None
+        row = index.row()
         if role == Qt.DisplayRole:
-            return Path(default).name
-        return default
+            return self._listing.names[row]
+        if role == Qt.EditRole:
+            return self._listing.full_path(row)
+        if role == Qt.DecorationRole and self.icon_provider:
+            if self.lazy_icons:
+                return self._lazy_icon(row)
+            icon = self._resolved_icons.get(row)  # no file lookups on repaint
+            if icon is None:
+                path = self._listing.full_path(row)
+                icon = self._resolved_icons[row] = (
+                    self.icon_provider(path) if self._local else
+                    self.icon_provider(path, self._generic_icon_key(row)))
+            return icon
+        return None
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return self._scan is not None and not parent.isValid()
 
-    def get_icon(self, path):
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        "Read next `fetch_size` entries of directory (`streaming` mode)"
+        # QCompleter requests more rows from `rowsInserted` handler, which
+        # would read the whole directory at once
+        if not self.canFetchMore(parent) or self._fetching:
+            return
+        try:
+            with metrics.timed('listing_chunk', path=self.current_path):
+                chunk = list(islice(self._scan, self.fetch_size))
+        except OSError:
+            chunk = []
+        if len(chunk) < self.fetch_size:  # directory is read to the end
+            self._scan = None
+            lst = Listing.from_entries(
+                self.current_path, self._listing.entries()).sort()
+            lst.mtime = self._scan_mtime
+            self._cache_listing(self.current_path, lst)
+            if self.disk_cache is not None:
+                self.disk_cache.put(self.current_path, self._disk_scope, lst)
+        if not chunk:
+            return
+        row = len(self._listing)
+        self._fetching = True
+        self.beginInsertRows(QtCore.QModelIndex(), row, row + len(chunk) - 1)
+        for name, flags in chunk:
+            self._listing.append(name, flags)
+        self.endInsertRows()
+        self._fetching = False
+
+    def listing(self):
+        "Entries of the current directory"
+        return self._listing
+
+    def get_icon(self, path, key=None):
         "Internal icon provider"
+        if key is not None and key[0][0] == 'generic':
+            return generic_icon(self.icons, *key[0][1:])
         return self.icons.icon(QtCore.QFileInfo(path))
 
-    def get_file_list(self, path):
-        "List entries in `path` directory"
-        lst = None
-        if self.fs_engine == 'pathlib':
-            lst = self.sort_paths([i for i in path.iterdir()
-                                   if self.filter != 'dirs' or i.is_dir()])
-        elif self.fs_engine == 'qt':
-            qdir = QtCore.QDir(str(path))
-            qdir.setFilter(qdir.Filter.NoDotAndDotDot | qdir.Filter.Hidden |
-                (qdir.Filter.Dirs if self.filter == 'dirs' else qdir.Filter.AllEntries))
-            names = qdir.entryList(sort=QtCore.QDir.SortFlag.DirsFirst |
-                                   QtCore.QDir.SortFlag.LocaleAware)
-            lst = [str(path / i) for i in names]
+    def _generic_icon_key(self, row):
+        "Icon key of entry by its type w/o filesystem access"
+        hidden = self._listing.is_hidden(row)
+        if self._listing.is_dir(row):
+            return generic_icon_key('folder', hidden=hidden)
+        suffix = os.path.splitext(self._listing.names[row])[1].lstrip('.')
+        return generic_icon_key('file', suffix, hidden)
+
+    def _lazy_icon(self, row):
+        "Get resolved icon or placeholder, schedule icon resolution"
+        icon = self._resolved_icons.get(row)
+        if icon is not None:
+            return icon
+        if row not in self._requested_icons:
+            self._pending_icons.add(row)
+            self._icon_timer.start(0)  # collect visible rows into one batch
+        is_dir = self._listing.is_dir(row)
+        icon = self._placeholder_icons.get(is_dir)
+        if icon is None:  # generic icon w/o filesystem access
+            ico_type = QtWidgets.QFileIconProvider.IconType
+            icon = self._placeholder_icons[is_dir] = \
+                QtWidgets.QFileIconProvider().icon(
+                    ico_type.Folder if is_dir else ico_type.File)
+        return icon
+
+    def _request_icon_keys(self):
+        "SLOT: get icon keys of pending entries in background"
+        items = [(i, self._listing.full_path(i)) for i in self._pending_icons]
+        self._requested_icons.update(self._pending_icons)
+        self._pending_icons.clear()
+        self.listing_pool().start(_IconKeysTask(
+            self.provider.icon_hint, items, QtGui.QGuiApplication.instance().devicePixelRatio(),
+            self._listing_id, self._icon_keys_signals
+        ))
+
+    def _icon_keys_ready(self, listing_id, keys):
+        "SLOT: resolve icons by keys, update affected rows"
+        if listing_id != self._listing_id:
+            return  # model was refilled
+        for row, path, key in keys:
+            self._resolved_icons[row] = self.icon_provider(path, key)
+            index = self.index(row, 0)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+    def get_file_list(self, path, previous=None) -> Listing:
+        """
+        List entries in `path` directory (thread-safe).
+        `previous` - earlier sorted listing of `path` to reuse sort keys
+        """
+        with metrics.timed('listing', path=path, engine=self.fs_engine):
+            lst = None
+            if isinstance(self.fs_engine, FSProvider):
+                lst = Listing.from_entries(path, chain.from_iterable(
+                    self.fs_engine.list_children(
+                        path, dirs_only=self.filter == 'dirs')))
+            elif self.fs_engine == 'pathlib':
+                entries = []
+                for i in path.iterdir():
+                    flags = IS_DIR if i.is_dir() else 0
+                    if self.filter == 'dirs' and not flags:
+                        continue
+                    if dot_hidden and i.name.startswith('.'):
+                        flags |= IS_HIDDEN
+                    entries.append((i.name, flags))
+                lst = Listing.from_entries(path, entries)
+            elif self.fs_engine == 'scandir':
+                lst = Listing.from_entries(path, scan_entries(
+                    path, dirs_only=self.filter == 'dirs'))
+            elif self.fs_engine == 'qt':
+                qdir = QtCore.QDir(str(path))
+                qdir.setFilter(qdir.Filter.NoDotAndDotDot | qdir.Filter.Hidden |
+                    (qdir.Filter.Dirs if self.filter == 'dirs' else qdir.Filter.AllEntries))
+                sort = QtCore.QDir.SortFlag.Unsorted  # see `Listing.sort`
+                if self.filter == 'dirs':  # no need to stat entries
+                    names = qdir.entryList(sort=sort)
+                    lst = Listing(path, names, (
+                        IS_DIR | IS_HIDDEN if dot_hidden and i.startswith('.')
+                        else IS_DIR for i in names))
+                else:
+                    lst = Listing.from_entries(path, (
+                        (i.fileName(), (IS_DIR if i.isDir() else 0) |
+                                       (IS_HIDDEN if i.isHidden() else 0))
+                        for i in qdir.entryInfoList(sort=sort)))
+            if lst is not None:
+                lst.sort(previous)
         return lst
 
     @staticmethod
     def sort_paths(paths):
-        "Windows-Explorer-like filename sorting (for 'pathlib' engine)"
-        dirs, files = [], []
-        for i in paths:
-            if i.is_dir():
-                dirs.append(str(i))
-            else:
-                files.append(str(i))
-        return sorted(dirs, key=str.lower) + sorted(files, key=str.lower)
+        "Windows-Explorer-like sorting of paths, folders first. Returns str"
+        return [i for i, _flags in FilenameModel.sort_entries(
+            (str(i), IS_DIR if Path(i).is_dir() else 0) for i in paths)]
+
+    @staticmethod
+    def sort_entries(entries):
+        "Windows-Explorer-like sorting of (name, flags) entries, folders first"
+        return list(Listing.from_entries(None, entries).sort().entries())
 
     def setPathPrefix(self, prefix):
         path = Path(prefix)
         if not prefix.endswith(os.path.sep):
             path = path.parent
         if path == self.current_path:
-            return  # already listed
-        if not path.exists():
+            return  # already listed (or being listed)
+        self._ticket += 1  # cancel pending background listing
+        lst = self.cache.get(path) if self.cache is not None else None
+        if lst is not None:
+            metrics.count('listing_cache_hit')
+            self._set_listing(path, lst)
+            if not self.cache.watch:  # changes are not reported
+                self._revalidate(path, lst)
+            return
+        metrics.count('listing_cache_miss')
+        lst = (self.disk_cache.get(path, self._disk_scope)
+               if self.disk_cache is not None else None)
+        if lst is not None:
+            metrics.count('disk_cache_hit')
+            self._set_listing(path, lst)
+            self._revalidate(path, lst)
+            return
+        if self.async_listing:
+            self._list_async(path)
+            return
+        if not self.path_exists(path):
             return  # wrong path
-        self.setStringList(self.get_file_list(path))
+        try:
+            if self.streaming:
+                mtime = self.provider.mtime(path)
+                scan = chain.from_iterable(self.provider.list_children(
+                    path, dirs_only=self.filter == 'dirs'))
+            else:
+                lst = self._list_dir(path,
+                                     previous=self._previous_listing(path))
+        except OSError:
+            self._set_listing(path, Listing(path))
+            self.listdir_error.emit(path)
+            return
+        if self.streaming:
+            self._set_listing(path, Listing(path))
+            self._scan_mtime, self._scan = mtime, scan
+            self.fetchMore()  # first chunk
+            return
+        self._set_listing(path, lst)
+        self._cache_listing(path, lst)
+
+    def _cache_listing(self, path, lst):
+        "Put listing into cache, list `path` again on request if outdated"
+        if self.cache is not None and not self.cache.put(path, lst):
+            self._directory_changed(str(path))
+
+    def _list_dir(self, path, cached=None, previous=None):
+        """
+        List `path` with `get_file_list`, set `Listing.mtime` and store
+        listing in `disk_cache`.
+        `cached` - listing (e.g. loaded from `disk_cache`) which is returned
+                   if directory has not been modified since its `mtime`
+        `previous` - see `get_file_list`
+        """
+        mtime = self.provider.mtime(path)  # before listing: catch changes
+        if cached is not None and mtime is not None and mtime == cached.mtime:
+            return cached
+        lst = self.get_file_list(path, previous)
+        if lst is not None:
+            lst.mtime = mtime
+            if self.disk_cache is not None:
+                self.disk_cache.put(path, self._disk_scope, lst)
+        return lst
+
+    def _previous_listing(self, path):
+        """
+        Shown listing of `path` if it is sorted. Sorted listings are not
+        modified, so they can be passed to listing tasks.
+        """
+        lst = self._listing
+        if lst.path == path and lst.keys is not None:
+            return lst
+        return None
+
+    def path_exists(self, path):
+        "Check if `path` exists, results are cached for `exists_ttl` seconds"
+        now = time.monotonic()
+        exists, checked = self._exists_cache.get(path, (None, 0))
+        if now - checked > self.exists_ttl:
+            exists = self.provider.exists(path)
+            self._exists_cache.put(path, (exists, now))
+        return exists
+
+    def _set_listing(self, path, lst):
+        "Fill model with entries of `path` directory"
+        self.beginResetModel()
+        self._listing = lst
+        self._scan = None
+        self._listing_id += 1
+        self._resolved_icons.clear()
+        self._pending_icons.clear()
+        self._requested_icons.clear()
+        self.endResetModel()
+        self.current_path = path
+        self._set_loading(False)
+
+    def _list_async(self, path):
+        "Start listing `path` in background, clear model meanwhile"
+        previous = self._previous_listing(path)
         self.current_path = path
+        self.beginResetModel()
+        self._listing = Listing()
+        self._scan = None
+        self.endResetModel()
+        self._set_loading(True)
+        self.listing_pool().start(_ListingTask(
+            partial(self._list_dir, previous=previous),
+            self.provider.exists, path, self._ticket,
+            self._is_current_ticket, self._listing_signals
+        ))
+
+    def _revalidate(self, path, lst):
+        """
+        Check `mtime` of listing loaded from `disk_cache` or from cache of
+        not watched filesystem in background, see `_revalidated`
+        """
+        self.listing_pool().start(_ListingTask(
+            partial(self._list_dir, cached=lst, previous=lst),
+            self.provider.exists,
+            path, self._ticket, self._is_current_ticket,
+            self._revalidation_signals
+        ))
+
+    def _revalidated(self, ticket, path, lst):
+        "SLOT: show fresh listing if the shown one is outdated"
+        if ticket != self._ticket:  # another path is shown
+            if lst is not None:
+                self._cache_listing(path, lst)
+            return
+        if lst is None:  # directory is not accessible anymore
+            if self.disk_cache is not None:
+                self.disk_cache.pop(path, self._disk_scope)
+            if self.cache is not None:
+                self.cache.pop(path)
+            self._set_listing(path, Listing(path))
+            return
+        if lst is not self._listing:
+            self._set_listing(path, lst)
+        self._cache_listing(path, lst)
+
+    def _is_current_ticket(self, ticket):
+        "Check if listing request `ticket` is not outdated (thread-safe)"
+        return ticket == self._ticket
+
+    def _listing_finished(self, ticket, path, lst):
+        "SLOT: background listing is done"
+        if ticket != self._ticket:
+            return  # stale result
+        self._set_listing(path, Listing(path) if lst is None else lst)
+        if lst is not None:
+            self._cache_listing(path, lst)
+
+    def _directory_changed(self, path):
+        "SLOT: cached listing is dropped, list current directory again later"
+        if Path(path) == self.current_path:
+            self.current_path = None
+
+    def prefetch(self, paths):
+        """
+        List directories in background at low priority and put them into
+        cache, so that `setPathPrefix` finds them. Replaces paths queued by
+        the previous call.
+        """
+        if self.cache is None:
+            return
+        self._prefetch_ticket += 1
+        self._prefetch_queue = [Path(i) for i in paths]
+        self._prefetch_next()
+
+    def _prefetch_next(self):
+        "Start listing queued paths within `prefetch_jobs` budget"
+        while self._prefetch_queue and \
+                self._prefetch_running < self.prefetch_jobs:
+            path = self._prefetch_queue.pop(0)
+            if path in self.cache or path == self.current_path:
+                continue  # already listed (or being listed)
+            self._prefetch_running += 1
+            self.listing_pool().start(_ListingTask(
+                partial(self._list_dir, previous=self._previous_listing(path)),
+                self.provider.exists, path,
+                self._prefetch_ticket, self._is_current_prefetch,
+                self._prefetch_signals
+            ), -1)  # after on-demand listings and icons
+
+    def _is_current_prefetch(self, ticket):
+        "Check if prefetch request `ticket` is not outdated (thread-safe)"
+        return ticket == self._prefetch_ticket
+
+    def _prefetch_finished(self, ticket, path, lst):
+        "SLOT: prefetched listing is done"
+        self._prefetch_running -= 1
+        if lst is not None and path not in self.cache:
+            self._cache_listing(path, lst)
+        self._prefetch_next()
+
+    def _set_loading(self, loading):
+        if loading != self._loading:
+            self._loading = loading
+            self.loading_changed.emit(loading)
+
+    def is_loading(self):
+        "Check if background listing is in progress"
+        return self._loading
 
 
 class MenuListView(QtWidgets.QMenu):
     """
     QMenu with QListView.
     Supports `activated`, `clicked`, `setModel`.
+    `button` - QToolButton the menu is shown for (parent by default), menu
+               is not narrower than the button
     """
     max_visible_items = 16
 
     def __init__(self, parent=None):
         super().__init__(parent)
+        self.button = parent if isinstance(parent, QtWidgets.QToolButton) else None
         self.listview = lv = QtWidgets.QListView()
         lv.setFrameShape(lv.Shape.NoFrame)
         lv.setHorizontalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
@@ -91,13 +573,16 @@ class MenuListView(QtWidgets.QMenu):
         pal.setColor(pal.ColorRole.Base, self.palette().color(pal.ColorRole.Window))
         lv.setPalette(pal)
 
-        act_wgt = QtWidgets.QWidgetAction(self)
+        self.act_listview = act_wgt = QtWidgets.QWidgetAction(self)
         act_wgt.setDefaultWidget(lv)
         self.addAction(act_wgt)
+        # Placeholder shown while model is listing a directory in background
+        self.act_loading = self.addAction("Loading...")
+        self.act_loading.setEnabled(False)
+        self.act_loading.setVisible(False)
 
         self.activated = lv.activated
         self.clicked = lv.clicked
-        self.setModel = lv.setModel
 
         lv.sizeHint = self.size_hint
         lv.minimumSizeHint = self.size_hint
@@ -113,6 +598,20 @@ class MenuListView(QtWidgets.QMenu):
         self.last_index = QtCore.QModelIndex()  # selected index
         self.flag_mouse_l_pressed = False
 
+    def setModel(self, model):
+        "Set list view model, track its `loading_changed` signal if any"
+        self.listview.setModel(model)
+        if hasattr(model, 'loading_changed'):
+            model.loading_changed.connect(self.set_loading)
+            self.set_loading(model.is_loading())
+
+    def set_loading(self, loading):
+        "Show loading placeholder instead of list view"
+        self.act_loading.setVisible(loading)
+        self.act_listview.setVisible(not loading)
+        if self.isVisible():
+            self.adjustSize()
+
     def key_press_event(self, event):
         key = event.key()
         if key in (Qt.Key_Return, Qt.Key_Enter):
@@ -164,7 +663,7 @@ class MenuListView(QtWidgets.QMenu):
         lv = self.listview
         width = lv.sizeHintForColumn(0)
         width += lv.verticalScrollBar().sizeHint().width()
-        if isinstance(self.parent(), QtWidgets.QToolButton):
-            width = max(width, self.parent().width())
+        if self.button is not None:
+            width = max(width, self.button.width())
         visible_rows = min(self.max_visible_items, lv.model().rowCount())
         return QtCore.QSize(width, visible_rows * lv.sizeHintForRow(0))
@@ -0,0 +1,43 @@
+from qtpy import QtCore, QtWidgets
+
+MOUNTINFO = "/proc/self/mountinfo"
+
+
+class MountWatcher(QtCore.QObject):
+    """
+    Emits `changed` when filesystems are mounted or unmounted.
+    Mount table is polled every `interval` ms: `QFileSystemWatcher`
+    does not report changes of /proc files.
+    """
+    changed = QtCore.Signal()
+    _instance = None
+
+    def __init__(self, interval=2000, parent=None):
+        super().__init__(parent)
+        self._mountinfo = self.read_mountinfo()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(interval)
+        self._timer.timeout.connect(self._poll)
+        self._timer.start()
+
+    @classmethod
+    def instance(cls):
+        "Watcher shared by all address bars"
+        if cls._instance is None:
+            cls._instance = cls(parent=QtWidgets.QApplication.instance())
+        return cls._instance
+
+    @staticmethod
+    def read_mountinfo():
+        try:
+            with open(MOUNTINFO, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _poll(self):
+        "SLOT: compare mount table with the last read one"
+        mountinfo = self.read_mountinfo()
+        if mountinfo != self._mountinfo:
+            self._mountinfo = mountinfo
+            self.changed.emit()
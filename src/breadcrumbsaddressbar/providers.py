@@ -0,0 +1,203 @@
+"""
+Filesystems browsed by the address bar.
+`FSProvider` lists directories in batches of entries, so remote stores
+and archives can be browsed w/o a round trip per entry.
+"""
+
+import os
+import time
+from itertools import batched
+from pathlib import Path
+
+from qtpy import QtCore
+
+from .icons import generic_icon_key, icon_key
+from .listing import IS_DIR, IS_HIDDEN, scan_entries
+
+
+class FSProvider:
+    """
+    Filesystem interface used by `FilenameModel` and `BreadcrumbsAddressBar`.
+    Methods are called from worker threads and should be thread-safe.
+    `batch_size` - max count of entries in a batch of `list_children`
+    `cache_scope` - str which identifies the filesystem (e.g. scheme and
+                    host or bucket) in `DiskListingCache` across sessions,
+                    None - listings are not stored on disk
+    """
+    batch_size = 256
+    cache_scope = None
+
+    def list_children(self, path: Path, dirs_only=False):
+        """
+        Generate batches (sequences) of (name, flags) entries of `path`
+        directory, see `listing.IS_DIR`, `listing.IS_HIDDEN`.
+        Raises OSError if directory cannot be listed.
+        """
+        raise NotImplementedError
+
+    def stat(self, path: Path):
+        "Flags of `path` entry or None if it does not exist"
+        raise NotImplementedError
+
+    def exists(self, path: Path):
+        return self.stat(path) is not None
+
+    def mtime(self, path: Path):
+        """
+        Modification time of `path` directory (any comparable value) to
+        check if a cached listing is outdated, None if unknown
+        """
+        return None
+
+    def resolve(self, path: Path) -> Path:
+        "Absolute normalized `path`. Raises PermissionError if not accessible"
+        raise NotImplementedError
+
+    def normpath(self, path: Path) -> Path:
+        "Absolute `path` normalized lexically w/o filesystem access"
+        return Path(os.path.normpath(os.path.join(os.path.sep, path)))
+
+    def icon_hint(self, path: Path, dpr=None):
+        "Icon key of entry: entries with equal keys share an icon (`icon_key`)"
+        flags = self.stat(path) or 0
+        return generic_icon_key(
+            'folder' if flags & IS_DIR else 'file',
+            Path(path).suffix.lstrip('.'), bool(flags & IS_HIDDEN), dpr)
+
+
+class LocalProvider(FSProvider):
+    "Local filesystem, directories are read with `os.scandir`"
+    cache_scope = 'local'
+
+    def list_children(self, path, dirs_only=False):
+        return batched(scan_entries(path, dirs_only), self.batch_size)
+
+    def stat(self, path):
+        fileinfo = QtCore.QFileInfo(str(path))
+        if not fileinfo.exists():
+            return None
+        return ((IS_DIR if fileinfo.isDir() else 0) |
+                (IS_HIDDEN if fileinfo.isHidden() else 0))
+
+    def exists(self, path):
+        return Path(path).exists()
+
+    def mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def resolve(self, path):
+        return Path(path).resolve()
+
+    def normpath(self, path):
+        return Path(os.path.abspath(path))
+
+    def icon_hint(self, path, dpr=None):
+        return icon_key(QtCore.QFileInfo(str(path)), dpr)
+
+
+class MemoryProvider(FSProvider):
+    """
+    In-memory tree of folders and files, e.g. for tests and benchmarks.
+    `tree` - {name: dict (folder contents) or None (file)}
+    `root` - path of the tree
+    """
+    def __init__(self, tree=None, root=os.path.sep):
+        self.tree = {} if tree is None else tree
+        self.root = Path(root)
+
+    def _node(self, path):
+        "Folder contents dict, None for a file. Raises FileNotFoundError"
+        try:
+            parts = Path(path).relative_to(self.root).parts
+        except ValueError:
+            raise FileNotFoundError(path) from None
+        node = self.tree
+        for i in parts:
+            if not isinstance(node, dict) or i not in node:
+                raise FileNotFoundError(path)
+            node = node[i]
+        return node
+
+    def add(self, path, is_dir=True):
+        "Add folder or file at `path`, create missing parent folders"
+        parts = Path(path).relative_to(self.root).parts
+        node = self.tree
+        for i in parts[:-1]:
+            node = node.setdefault(i, {})
+        node.setdefault(parts[-1], {} if is_dir else None)
+
+    @staticmethod
+    def _flags(name, node):
+        return ((IS_DIR if isinstance(node, dict) else 0) |
+                (IS_HIDDEN if name.startswith('.') else 0))
+
+    def list_children(self, path, dirs_only=False):
+        node = self._node(path)
+        if not isinstance(node, dict):
+            raise NotADirectoryError(path)
+        entries = ((name, self._flags(name, child))
+                   for name, child in list(node.items())
+                   if not dirs_only or isinstance(child, dict))
+        return batched(entries, self.batch_size)
+
+    def stat(self, path):
+        try:
+            return self._flags(Path(path).name, self._node(path))
+        except FileNotFoundError:
+            return None
+
+    def resolve(self, path):
+        return self.normpath(path)
+
+    def normpath(self, path):
+        return Path(os.path.normpath(self.root / path))
+
+
+class LatencyProvider(FSProvider):
+    """
+    Emulates a network filesystem: adds `latency` seconds to each call to
+    `provider` (to each batch in `list_children`)
+    """
+    def __init__(self, provider=None, latency=0.001):
+        self.provider = LocalProvider() if provider is None else provider
+        self.latency = latency
+
+    @property
+    def batch_size(self):
+        return self.provider.batch_size
+
+    @property
+    def cache_scope(self):
+        return self.provider.cache_scope
+
+    def list_children(self, path, dirs_only=False):
+        time.sleep(self.latency)
+        for batch in self.provider.list_children(path, dirs_only):
+            yield batch
+            time.sleep(self.latency)  # request next batch
+
+    def stat(self, path):
+        time.sleep(self.latency)
+        return self.provider.stat(path)
+
+    def exists(self, path):
+        time.sleep(self.latency)
+        return self.provider.exists(path)
+
+    def mtime(self, path):
+        time.sleep(self.latency)
+        return self.provider.mtime(path)
+
+    def resolve(self, path):
+        time.sleep(self.latency)
+        return self.provider.resolve(path)
+
+    def normpath(self, path):
+        return self.provider.normpath(path)
+
+    def icon_hint(self, path, dpr=None):
+        time.sleep(self.latency)
+        return self.provider.icon_hint(path, dpr)